@@ -0,0 +1,185 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import sys
+import time
+import numpy
+import scipy
+from scipy import stats
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from uber_model import Board
+from uber_model.geometry import findInRange
+from uber_model.population import Population
+
+# Benchmark timing each phase of a simulation on the uber_model engine, over a grid of board sizes.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# A run of one model is made of these phases, each timed on its own:
+#   placement     - placing the drivers and riders on the board
+#   findInRange   - finding the riders in range of every driver and building the coverage graph
+#   population    - drawing every agent's sex, malice, target and preference
+#   boardSetup    - the rest of Board.__init__ on the built population (Board.findRidersInRange, queues, policy)
+#   nextDay       - choosing each day's riders and building the pickup queues, summed over the days
+#   matching      - the rounds of rides and assault draws, summed over the days
+#   statistics    - the two t-tests at the end of each model, on numSims totals
+# Each grid point is run `repeats` times with the same seeds and the fastest time of each phase is kept,
+# which is the least affected by other work on the machine.
+
+# As in Benchmark_spatial_index.py, the board is grown with numDrivers so the density of drivers is the
+# same as in the 1000-driver models; ridersPer and radius then set how many riders each driver covers.
+
+# Results are written as JSON. Running with --compare and an earlier results file flags every phase
+# that got slower than the stored time by more than the tolerance, and exits with status 1 if any did.
+
+#ADJUSTABLE VARIABLES
+driverCounts = [500, 1000, 2000]    #NUMBER OF DRIVERS TO BENCHMARK
+ridersPers = [11.1, 22.2]           #NUMBERS OF RIDERS GENERATED PER DRIVER TO BENCHMARK
+radii = [0.5, 1]                    #RADII THE DRIVERS CAN GIVE RIDES IN TO BENCHMARK
+numDays = 10                        #NUMBER OF DAYS SIMULATED AT EACH GRID POINT
+numSims = 50                        #NUMBER OF SIMULATION TOTALS IN THE STATISTICS PHASE
+repeats = 3                         #NUMBER OF TIMES EACH GRID POINT IS RUN
+tolerance = 0.5                     #FRACTION SLOWER THAN THE BASELINE A PHASE CAN GET BEFORE IT IS FLAGGED
+driversPerSide = 1000               #NUMBER OF DRIVERS ON THE ORIGINAL 10x10 BOARD
+minTime = 0.005                     #PHASES FASTER THAN THIS (SECONDS) IN THE BASELINE ARE NEVER FLAGGED
+
+PHASES = ["placement", "findInRange", "population", "boardSetup", "nextDay", "matching", "statistics"]
+
+
+#Times one run of every phase at one grid point.
+#Returns a dictionary of times in seconds by phase, and the size of the board.
+def runPhases(numDrivers, ridersPer, radius, engine, seed):
+    times = {}
+    boardSize = 10 * math.sqrt(numDrivers / driversPerSide)
+    overrides = {"numDrivers": numDrivers, "ridersPer": ridersPer, "radius": radius, "boardSize": boardSize, "numDays": numDays, "engine": engine}
+    geometrySeed, populationSeed, daySeed, assaultSeed, policySeed = numpy.random.SeedSequence(seed).spawn(5)
+    parameters = Board.__new__(Board)
+    parameters.setParameters(overrides)
+
+    start = time.perf_counter()
+    rng = numpy.random.default_rng(geometrySeed)
+    driverCoords = rng.uniform(0, boardSize, (numDrivers, 2)).astype(numpy.float32)
+    riderCoords = rng.uniform(0, boardSize, (int(ridersPer*numDrivers), 2)).astype(numpy.float32)
+    times["placement"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    geometry = findInRange(driverCoords, riderCoords, radius)
+    times["findInRange"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    population = Population(parameters, numpy.random.default_rng(populationSeed), geometry)
+    times["population"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    board = Board(seed, None, population, **overrides)
+    times["boardSetup"] = time.perf_counter() - start
+
+    nextDayTime = [0.0]
+    nextDay = board.nextDay
+    def timedNextDay(draws=None):
+        start = time.perf_counter()
+        nextDay(draws)
+        nextDayTime[0] += time.perf_counter() - start
+    board.nextDay = timedNextDay
+    start = time.perf_counter()
+    board.runSim()
+    times["nextDay"] = nextDayTime[0]
+    times["matching"] = time.perf_counter() - start - nextDayTime[0]
+
+    #The t-tests only depend on how many totals there are, so stand-in totals are used.
+    rng = numpy.random.default_rng(seed)
+    totalRides = rng.normal(board.expectedRides, math.sqrt(board.expectedRides), numSims)
+    totalAssaults = rng.poisson(board.expectedAssaults, numSims)
+    start = time.perf_counter()
+    scipy.stats.ttest_1samp(totalRides, board.expectedRides, alternative="two-sided")
+    scipy.stats.ttest_1samp(totalAssaults, board.expectedAssaults, alternative="two-sided")
+    times["statistics"] = time.perf_counter() - start
+
+    size = {"numRiders": board.numRiders, "edges": board.numEdges, "rides": sum(board.rides), "assaults": sum(board.assaults)}
+    return times, size
+
+
+#Runs every grid point `repeats` times and keeps the fastest time of each phase.
+#Returns the results as a dictionary ready to be written as JSON.
+def runGrid(grid, engine, seed, verbose=True):
+    results = []
+    for numDrivers, ridersPer, radius in grid:
+        best = None
+        for repeat in range(repeats):
+            times, size = runPhases(numDrivers, ridersPer, radius, engine, seed)
+            best = times if best is None else {phase: min(best[phase], times[phase]) for phase in PHASES}
+        result = {"numDrivers": numDrivers, "ridersPer": ridersPer, "radius": radius}
+        result.update(size)
+        result["times"] = best
+        results.append(result)
+        if (verbose):
+            print("%-8d %-9g %-7g %-8d " % (numDrivers, ridersPer, radius, size["edges"]) + " ".join("%-11.4f" % best[phase] for phase in PHASES))
+    return {
+        "engine": engine,
+        "numDays": numDays,
+        "repeats": repeats,
+        "seed": seed,
+        "machine": {"python": platform.python_version(), "numpy": numpy.__version__, "scipy": scipy.__version__,
+                    "platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+
+#Compares results with a baseline of the same format, matching grid points by
+#(numDrivers, ridersPer, radius). Returns a list of (grid point, phase, baseline time, new time)
+#for the phases more than `tolerance` slower than the baseline.
+def findRegressions(results, baseline, tolerance):
+    stored = {(row["numDrivers"], row["ridersPer"], row["radius"]): row["times"] for row in baseline["results"]}
+    regressions = []
+    for row in results["results"]:
+        point = (row["numDrivers"], row["ridersPer"], row["radius"])
+        if (point not in stored):
+            continue
+        for phase in PHASES:
+            before = stored[point].get(phase)
+            if (before is not None and before >= minTime and row["times"][phase] > before * (1 + tolerance)):
+                regressions.append((point, phase, before, row["times"][phase]))
+    return regressions
+
+
+#MAIN CODE
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times each phase of a simulation over a grid of board sizes.")
+    parser.add_argument("--drivers", type=int, nargs="+", default=driverCounts, help="numDrivers values")
+    parser.add_argument("--riders-per", type=float, nargs="+", default=ridersPers, help="ridersPer values")
+    parser.add_argument("--radius", type=float, nargs="+", default=radii, help="radius values")
+    parser.add_argument("--days", type=int, default=numDays, help="days simulated at each grid point")
+    parser.add_argument("--repeats", type=int, default=repeats, help="runs of each grid point; the fastest is kept")
+    parser.add_argument("--engine", default=Board.engine, choices=["batched", "sequential"])
+    parser.add_argument("--seed", type=int, default=2112)
+    parser.add_argument("--output", default="benchmark_phases.json", help="file to write the results to")
+    parser.add_argument("--compare", help="earlier results file to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=tolerance, help="fraction slower than the baseline that is flagged")
+    args = parser.parse_args()
+    numDays = args.days
+    repeats = args.repeats
+
+    print("drivers  ridersPer radius  edges    " + " ".join("%-11s" % phase for phase in PHASES))
+    results = runGrid(itertools.product(args.drivers, args.riders_per, args.radius), args.engine, args.seed)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print("Results written to " + args.output)
+
+    if (args.compare is not None):
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if ((baseline["engine"], baseline["numDays"]) != (results["engine"], results["numDays"])):
+            print(args.compare + " was run with a different engine or number of days, so its times cannot be compared")
+            sys.exit(2)
+        regressions = findRegressions(results, baseline, args.tolerance)
+        for point, phase, before, after in regressions:
+            print("REGRESSION at numDrivers=%d ridersPer=%g radius=%g: %s took %.4f s, baseline %.4f s (%+.0f%%)"
+                  % (point + (phase, after, before, 100 * (after / before - 1))))
+        if (len(regressions) > 0):
+            sys.exit(1)
+        print("No phase more than " + str(int(args.tolerance * 100)) + "% slower than " + args.compare)
@@ -0,0 +1,84 @@
+import random as r
+import math
+import sys
+import time
+import numpy
+from scipy import spatial
+
+# Benchmark comparing the original all-pairs Driver.findRidersInRange scan against the
+# cKDTree spatial index now used by every model's Board.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# The models place every driver and rider on a 10x10 board. Scaling numDrivers on a board that size
+# would put tens of thousands of riders in every driver's radius, so this benchmark grows the board
+# with the number of drivers to keep the density (and so the size of each ridersInRange set) the same
+# as the 1000-driver models.
+
+# The all-pairs scan is quadratic, so at large sizes it is only timed for a sample of drivers and the
+# per-driver time is scaled up to the full board. Those rows are marked as estimated.
+
+#ADJUSTABLE VARIABLES
+driverCounts = [1000, 10000, 100000]    #NUMBER OF DRIVERS TO BENCHMARK
+ridersPer = 22.2                        #NUMBER OF RIDERS GENERATED PER DRIVER
+radius = 1                              #RADIUS THE DRIVER CAN GIVE RIDES IN
+driversPerSide = 1000                   #NUMBER OF DRIVERS ON THE ORIGINAL 10x10 BOARD
+maxBruteChecks = 5000000                #MOST DISTANCE CHECKS TIMED WITH THE ALL-PAIRS SCAN BEFORE ESTIMATING
+
+
+#The original all-pairs scan from Driver.findRidersInRange, on plain coordinate tuples.
+def bruteRidersInRange(driverCoords, riderCoords, radius):
+    ridersInRange = set()
+    for i in range(len(riderCoords)):
+        x = riderCoords[i][0] - driverCoords[0]
+        y = riderCoords[i][1] - driverCoords[1]
+        if (x*x + y*y <= radius*radius):
+            ridersInRange.add(i)
+    return ridersInRange
+
+
+#Times the all-pairs scan and the spatial index for one board size.
+#Returns a dictionary of timings in seconds.
+def benchmark(numDrivers):
+    side = 10 * math.sqrt(numDrivers / driversPerSide)
+    driverCoords = [(r.uniform(0, side), r.uniform(0, side)) for i in range(numDrivers)]
+    riderCoords = [(r.uniform(0, side), r.uniform(0, side)) for i in range(int(ridersPer*numDrivers))]
+
+    start = time.perf_counter()
+    tree = spatial.cKDTree(riderCoords)
+    indexed = [tree.query_ball_point(coords, radius) for coords in driverCoords]
+    indexTime = time.perf_counter() - start
+
+    sample = r.sample(range(numDrivers), max(1, min(numDrivers, maxBruteChecks // len(riderCoords))))
+    start = time.perf_counter()
+    brute = [bruteRidersInRange(driverCoords[i], riderCoords, radius) for i in sample]
+    bruteTime = (time.perf_counter() - start) * numDrivers / len(sample)
+
+    for i, found in zip(sample, brute):
+        if (set(indexed[i]) != found):
+            raise AssertionError("spatial index disagrees with the all-pairs scan for driver " + str(i))
+
+    return {
+        "numDrivers": numDrivers,
+        "numRiders": len(riderCoords),
+        "edges": sum(len(found) for found in indexed),
+        "bruteTime": bruteTime,
+        "bruteEstimated": len(sample) < numDrivers,
+        "indexTime": indexTime,
+    }
+
+
+#MAIN CODE
+
+if __name__ == "__main__":
+    r.seed(2112)		#Set Seed
+    if (len(sys.argv) > 1):
+        driverCounts = [int(arg) for arg in sys.argv[1:]]
+    print("drivers   riders     edges      all-pairs (s)    spatial index (s)   speed-up")
+    for numDrivers in driverCounts:
+        result = benchmark(numDrivers)
+        brute = ("%.2f" % result["bruteTime"]) + ("*" if result["bruteEstimated"] else "")
+        print("%-9d %-10d %-10d %-16s %-19.3f %.0fx" % (result["numDrivers"], result["numRiders"], result["edges"],
+                                                     brute, result["indexTime"], result["bruteTime"] / result["indexTime"]))
+    print("* estimated from a sample of drivers")
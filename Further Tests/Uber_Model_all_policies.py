@@ -0,0 +1,58 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from uber_model import paired
+from uber_model.policies import (Policy, SafetyMeasures, DriverVetting, MoreWomenDrivers, SexSegregation,
+                                 DriverAccountability, RiderAccountability, OptOutSegregation)
+
+# Every model in this folder, run as policies on one engine in a single paired sweep.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# Each of the other files in this folder is a copy of the baseline with one change, and each builds
+# its own boards and runs its own 50 simulations. Here the changes are policies (uber_model/policies.py)
+# and every simulation builds one population and runs the baseline and all of the policies on it in
+# lockstep (uber_model/paired.py), with the same riders needing rides on the same days. Each policy is
+# then compared with the baseline run on the same boards, with a paired t-test.
+
+# The settings are the ones used for the runs in the_main_runs.txt. DriverVetting vets the drivers,
+# which fixes a bug in Uber_Model_driver_vetting.py: that script applies vettingEfficacy in its Rider
+# class, so the driver vetting run in the_main_runs.txt is really a run of rider vetting, and the
+# "driver vetting" results here cannot be compared with it.
+
+
+#MAIN CODE
+
+if __name__ == "__main__":
+    seed = 2112		#Set Seed
+    numSims = 50        #Number of paired simulations to run
+    numWorkers = os.cpu_count()     #Number of processes to run the simulations on
+    policies = {
+        "baseline": Policy(),
+        "safety": SafetyMeasures(0.4),
+        "driver vetting": DriverVetting(0.5),
+        "half women drivers": MoreWomenDrivers(0.5),
+        "all women drivers": MoreWomenDrivers(0.0),
+        "sex segregation": SexSegregation(),
+        "driver accountability 1": DriverAccountability(1),
+        "driver accountability 3": DriverAccountability(3),
+        "driver accountability 10": DriverAccountability(10),
+        "rider accountability 1": RiderAccountability(1, 1),
+        "rider accountability 3": RiderAccountability(3, 3),
+        "rider accountability 5": RiderAccountability(5, 5),
+        "opt-out segregation": OptOutSegregation(0.3, 0.7),
+    }
+    results = dict(zip(policies, paired.runPaired(list(policies.values()), numSims, numWorkers, seed)))
+
+    #Print Data:
+    for name, (total_rides, total_assaults) in results.items():
+        print(name + " total assaults in each sim: ")
+        print(str(total_assaults))
+    print()
+
+    # Significance tests
+    baseline_rides, baseline_assaults = results["baseline"]
+    for name, (total_rides, total_assaults) in results.items():
+        if (name != "baseline"):
+            paired.printPairedTest("Assaults", "baseline", name, baseline_assaults, total_assaults)
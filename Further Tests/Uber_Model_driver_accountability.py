@@ -1,9 +1,15 @@
 import random as r
+import os
+import sys
 import math
+from collections import deque
 #import matplotlib.pyplot as plotter
 import numpy
 import scipy
 from scipy import stats
+from scipy import spatial
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from uber_model import runner, sequential
 
 # Rideshare service model, with drivers removed and re-rolled for assaults
 
@@ -40,6 +46,7 @@ class Board:
         self.day = 0                #GETTER FOR CURRENT DAY
         self.assaults = []          #TRACKS ASSAULTS BY DAY 
         self.rides = []             #TRACKS TOTAL RIDES BY DAY
+        self.staleSkips = []        #TRACKS QUEUED RIDERS SKIPPED BECAUSE ANOTHER DRIVER ALREADY SERVED THEM, BY DAY
         self.activeRiders = set()      #SET OF RIDERS WHO NEED A RIDE THAT DAY
         self.activeDrivers = set()     #SET OF DRIVERS WHO CAN STILL GIVE A RIDE THAT DAY
         self.driversToRemove = set()   #SET OF DRIVERS NOT ACTIVE AFTER EACH BATCH OF RIDES
@@ -50,6 +57,8 @@ class Board:
         for i in range(int(self.ridersPer*self.numDrivers)):         #Generate riders
             self.setRiders.add(Rider(self))
         
+        self.riderList = list(self.setRiders)      #RIDERS IN THE SAME ORDER AS THE SPATIAL INDEX
+        self.riderTree = spatial.cKDTree([rider.coords for rider in self.riderList])   #SPATIAL INDEX OF RIDER COORDINATES
         for driver in (self.setDrivers):
             driver.findRidersInRange(self)
 
@@ -57,6 +66,8 @@ class Board:
             active = rider.nextDay()
             if (active):
                 self.activeRiders.add(rider)
+                for driver in rider.driversInRange:
+                    driver.activeInRange.append(rider)
         for driver in self.setDrivers:
             driver.nextDay(self)
         # print("simulation setup complete")
@@ -67,6 +78,7 @@ class Board:
         for day in range(self.numDays):
             self.assaults.append(0)
             self.rides.append(0)
+            self.staleSkips.append(0)
             self.day = day
             self.activeDrivers = self.setDrivers.copy()
 
@@ -82,10 +94,14 @@ class Board:
                 self.driversToRemove.clear()
             self.activeRiders.clear()                      #Reset for next day
             self.activeDrivers.clear()
+            for driver in self.setDrivers:
+                driver.activeInRange.clear()
             for rider in self.setRiders:
                 active = rider.nextDay()
                 if (active):
                     self.activeRiders.add(rider)
+                    for driver in rider.driversInRange:
+                        driver.activeInRange.append(rider)
             for driver in self.setDrivers:
                 driver.nextDay(self)
 
@@ -99,12 +115,13 @@ class Driver:
     daysUntilReroll = 10         #THE NUMBER OF DAYS AFTER A DRIVER COMMITS AN ASSAULT UNTIL REROLL
 
     def __init__(self, board):
+        self.id = len(board.setDrivers)     #INDEX OF THE DRIVER ON THE BOARD
         self.ridesGiven = 0            #NUMBER OF RIDES GIVEN THAT DAY
         self.male = False               #INDICATES THE SEX OF THE DRIVER
         self.targetWomen = None         #IF MALICIOUS, INDICATES TARGET SEX
         self.coords = (r.uniform(0, 10), r.uniform(0, 10))  #COORDINATES OF THE DRIVER
         self.ridersInRange = set()      #SET OF THE RIDERS IN RANGE OF THE DRIVER
-        self.activeInRange = []         #LIST OF ACTIVE RIDERS IN RANGE  
+        self.activeInRange = deque()    #QUEUE OF ACTIVE RIDERS IN RANGE
         self.isMalicious = False        #MALICIOUS INDICATOR
         self.daysSinceAssault = (-1) * (board.numDays + 1)    #THE NUMBER OF DAYS SINCE THE FIRST ASSAULT THIS DRIVER COMMITTED AFTER CREATION OR REROLL
 
@@ -126,33 +143,35 @@ class Driver:
                 else:
                     self.targetWomen = False
 
-    #Populates the driver's ridersInRange set. 
-    #Must be called AFTER all of the riders have been generated.
+    #Drivers hash by id rather than by memory address, so sets of drivers iterate in the
+    #same order in every process and a seeded simulation always gives the same results.
+    def __hash__(self):
+        return self.id
+
+    #Populates the driver's ridersInRange set, and adds the driver to each of those riders' driversInRange list.
+    #Must be called AFTER all of the riders have been generated and the board's
+    #spatial index (riderTree) has been built.
     def findRidersInRange (self, board):
-        for rider in board.setRiders:
-            x = rider.coords[0] - self.coords[0]
-            y = rider.coords[1] - self.coords[1]
-            if (x*x + y*y <= self.radius*self.radius):
-                self.ridersInRange.add(rider)
-
-    #Finds the riders in range that need a ride that day.
-    #Requires that self.ridersInRange has been populated.
-    def findActiveInRange(self):
-        for rider in self.ridersInRange:
-            if (rider.needRide):
-                self.activeInRange.append(rider)
-        r.shuffle(self.activeInRange)
+        for i in board.riderTree.query_ball_point(self.coords, self.radius):
+            rider = board.riderList[i]
+            self.ridersInRange.add(rider)
+            rider.driversInRange.append(self)
+
+    #Puts the riders the board added to activeInRange for the day in a random order.
+    def shuffleActiveInRange(self):
+        activeInRange = list(self.activeInRange)
+        r.shuffle(activeInRange)
+        self.activeInRange = deque(activeInRange)
 
     #Resets the driver for the next day.
-    #Must be called AFTER the all of the riders are prepared
-    #for the next day. 
+    #Must be called AFTER the board has added the day's active riders
+    #to activeInRange. 
     def nextDay(self, board):
         self.ridesGiven = 0
         self.daysSinceAssault += 1
         if (self.daysSinceAssault >= self.daysUntilReroll):
             self.reroll(board)
-        self.activeInRange.clear()
-        self.findActiveInRange()
+        self.shuffleActiveInRange()
         
         
     #Returns alias to rider if driver gave a ride to that rider.
@@ -160,10 +179,11 @@ class Driver:
     def giveRide(self, board):
         rider = None
         if (len(self.activeInRange) > 0 and self.ridesGiven < 10):
-            rider = self.activeInRange.pop(0)
+            rider = self.activeInRange.popleft()
             while (not (rider in board.activeRiders) and (not (rider is None))):
+                board.staleSkips[board.day] = board.staleSkips[board.day] + 1
                 if (len(self.activeInRange) > 0):
-                    rider = self.activeInRange.pop(0)
+                    rider = self.activeInRange.popleft()
                 else:
                     rider = None
             if (not rider is None):
@@ -173,20 +193,24 @@ class Driver:
                     if ((self.male and not rider.targetWomen) and (r.random() < board.probAssault)):  #Assault occurs     
                         board.assaults[board.day] = board.assaults[board.day] + 1
                         self.ridersInRange.remove(rider)
+                        rider.driversInRange.remove(self)
                         assaultHappened = True
                     elif ((not self.male and rider.targetWomen) and (r.random() < board.probAssault)):  #Assault occurs
                         board.assaults[board.day] = board.assaults[board.day] + 1
                         self.ridersInRange.remove(rider)
+                        rider.driversInRange.remove(self)
                         assaultHappened = True
                 if (self.isMalicious and not assaultHappened):
                     if ((rider.male and not self.targetWomen) and (r.random() < board.probAssault)):   #Assault occurs
                         board.assaults[board.day] = board.assaults[board.day] + 1
                         self.ridersInRange.remove(rider)
+                        rider.driversInRange.remove(self)
                         if (self.daysSinceAssault < 0):
                             self.daysSinceAssault = 0
                     elif ((not rider.male and self.targetWomen) and (r.random() < board.probAssault)): #Assault occurs
                         board.assaults[board.day] = board.assaults[board.day] + 1
                         self.ridersInRange.remove(rider)
+                        rider.driversInRange.remove(self)
                         if (self.daysSinceAssault < 0):
                             self.daysSinceAssault = 0
         return rider
@@ -225,9 +249,11 @@ class Rider:
     probMale = 0.5                      #PROBABILITY THE RIDER IS MALE
 
     def __init__(self, board):
+        self.id = len(board.setRiders)          #INDEX OF THE RIDER ON THE BOARD
         self.male = False                   #INDICATES THE SEX OF THE RIDER
         self.needRide = False               #INDICATES IF RIDER NEEDS A RIDE THAT DAY
         self.coords = (r.uniform(0, 10), r.uniform(0, 10))              #COORDINATES OF THE RIDER
+        self.driversInRange = []            #LIST OF THE DRIVERS WHO HAVE THE RIDER IN RANGE
         self.targetWomen = None             #IF MALICIOUS, INDICATES PREFERRED TARGET SEX
         self.isMalicious = False            #MALICIOUSNESS INDICATOR
         if (r.random() < self.probMale):
@@ -247,6 +273,10 @@ class Rider:
                 else:
                     self.targetWomen = False
 
+    #Riders hash by id for the same reason as drivers.
+    def __hash__(self):
+        return self.id
+
     #Resets the rider for the next day.
     def nextDay(self):
         self.needRide = False
@@ -263,46 +293,44 @@ class Rider:
 
 #MAIN CODE
 
-r.seed(14341434)		#Set Seed
-total_assaults = []	#List to store the total number of assaults per simulation
-total_rides = []    #List to store the total number of rides per simulation
-for i in range(50):	#Run 50 simulations
-    b = Board()
-    b.runSim()
-    print("Simulation " + str(i + 1) + " complete! ")
-    total_assaults.append(sum(b.assaults))
-    total_rides.append(sum(b.rides))
-
-
-#Print Data:
-print("Total rides in each sim: ")
-print(str(total_rides))
-print("Total assaults in each sim: ")
-print(str(total_assaults))
-print()
-
-# Significance tests
-print("Rides test: ")
-alpha = 0.05
-print("Ho: mu = " + str(Board.expectedRides))
-print("Ha: mu != " + str(Board.expectedRides))
-print("Significance level = " + str(alpha))
-print("average rides per sim: " + str(numpy.mean(total_rides)))
-s, p = scipy.stats.ttest_1samp(total_rides, Board.expectedRides, alternative="two-sided")
-print("P_value = " + str(p))
-print("Reject Ho = " + str((p < alpha)))
-print()
-
-print("Assaults test: ")
-alpha = 0.05
-print("Ho: mu = " + str(Board.expectedAssaults))
-print("Ha: mu != " + str(Board.expectedAssaults))
-print("Significance level = " + str(alpha))
-print("mean assaults: " + str(numpy.mean(total_assaults)))
-s, p = scipy.stats.ttest_1samp(total_assaults, Board.expectedAssaults, alternative="two-sided")
-print("P_value = " + str(p))
-print("Reject Ho = " + str((p < alpha)))
-
-
-
-
+if __name__ == "__main__":
+    seed = 14341434		#Set Seed
+    numWorkers = os.cpu_count()     #Number of processes to run the simulations on
+    stopEarly = False       #Stop running simulations once the assaults test is decided (see uber_model/sequential.py)
+    if (stopEarly):
+        total_rides, total_assaults, total_stale_skips, sequential_test = sequential.runSequential(Board, Board.expectedAssaults, 50, numWorkers, seed)
+    else:
+        total_rides, total_assaults, total_stale_skips = runner.runReplications(Board, 50, numWorkers, seed)	#Run 50 simulations
+
+
+    #Print Data:
+    print("Total rides in each sim: ")
+    print(str(total_rides))
+    print("Total assaults in each sim: ")
+    print(str(total_assaults))
+    print("Average stale queue entries skipped per sim: " + str(numpy.mean(total_stale_skips)))
+    print()
+    if (stopEarly):
+        sequential.printSequentialTest(sequential_test, Board.expectedAssaults)
+
+    # Significance tests
+    print("Rides test: ")
+    alpha = 0.05
+    print("Ho: mu = " + str(Board.expectedRides))
+    print("Ha: mu != " + str(Board.expectedRides))
+    print("Significance level = " + str(alpha))
+    print("average rides per sim: " + str(numpy.mean(total_rides)))
+    s, p = scipy.stats.ttest_1samp(total_rides, Board.expectedRides, alternative="two-sided")
+    print("P_value = " + str(p))
+    print("Reject Ho = " + str((p < alpha)))
+    print()
+
+    print("Assaults test: ")
+    alpha = 0.05
+    print("Ho: mu = " + str(Board.expectedAssaults))
+    print("Ha: mu != " + str(Board.expectedAssaults))
+    print("Significance level = " + str(alpha))
+    print("mean assaults: " + str(numpy.mean(total_assaults)))
+    s, p = scipy.stats.ttest_1samp(total_assaults, Board.expectedAssaults, alternative="two-sided")
+    print("P_value = " + str(p))
+    print("Reject Ho = " + str((p < alpha)))
@@ -0,0 +1,45 @@
+import os
+import numpy
+from uber_model import paired
+from uber_model.policies import Policy, RiderChoice
+
+# Paired version of the choice test: the baseline model and the rider choice model are run on the
+# same boards, with the same riders needing rides on the same days.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# Uber_Model_choice_test.py compares its mean number of assaults with the expected number from the
+# baseline. That comparison has to overcome all of the board-to-board variation in both models. Here
+# each simulation builds one population and runs both models on it (see uber_model/paired.py), and the
+# two are compared with a paired t-test on the per-simulation differences.
+
+# Both models use the baseline's assault rules, so the only difference between them is rider choice.
+# This is not a re-run of the choice model in the_main_runs.txt: Uber_Model_choice_test.py never
+# checks the driver for an assault when the rider is malicious, while the baseline does whenever the
+# rider did not assault. RiderChoice(driverAssaultsMaliciousRiders=False) runs the choice test's rule.
+# The rider preference probabilities are the same as in Uber_Model_choice_test.py.
+
+
+#MAIN CODE
+
+if __name__ == "__main__":
+    seed = 1221		#Set Seed
+    numSims = 50        #Number of paired simulations to run
+    numWorkers = os.cpu_count()     #Number of processes to run the simulations on
+    (baseline_rides, baseline_assaults), (choice_rides, choice_assaults) = paired.runPaired([Policy(), RiderChoice()], numSims, numWorkers, seed)
+
+    #Print Data:
+    print("Baseline total rides in each sim: ")
+    print(str(baseline_rides))
+    print("Choice total rides in each sim: ")
+    print(str(choice_rides))
+    print("Baseline total assaults in each sim: ")
+    print(str(baseline_assaults))
+    print("Choice total assaults in each sim: ")
+    print(str(choice_assaults))
+    print()
+
+    # Significance tests
+    paired.printPairedTest("Rides", "baseline", "choice", baseline_rides, choice_rides)
+    paired.printPairedTest("Assaults", "baseline", "choice", baseline_assaults, choice_assaults)
@@ -0,0 +1,11 @@
+# Shared engine for the rideshare service models.
+
+# The Uber_Model_* scripts each carry their own copy of the Board, Driver and Rider classes.
+# This package holds the pieces that are meant to be reused across them, starting with a
+# struct-of-arrays version of the baseline Board.
+
+from .board import Board
+from .geometry import Geometry, GeometryCache
+from .population import Population, DriverView, RiderView
+from .profiler import Profiler
+from .shared import SharedPopulation
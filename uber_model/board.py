@@ -0,0 +1,595 @@
+import json
+import os
+import random as r
+from collections import deque
+
+import numpy
+
+from .geometry import Geometry, buildGeometry, geometryKey
+from .population import Population, AgentList, DriverView, RiderView
+from .policies import Policy
+
+# Rideshare service model on struct-of-arrays storage. This is the baseline model from
+# Uber_Model_baseline.py with every driver and rider addressed by an integer ID instead of an object.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# The parameters and their sources are the same as in Uber_Model_baseline.py and
+# Uber_Model_choice_test.py. Any of them can be changed for one board by passing it as a keyword
+# argument, e.g. Board(probAssault=0.4), or for every board by subclassing and overriding the class
+# attribute, the same way the Further Tests models do. Policies such as rider choice are plugged in
+# with the policy argument (see policies.py). The policy's hooks can change the agents, which
+# (driver, rider) pairs can be matched, each driver's pickup order, who needs a ride, the probability
+# of an assault and what happens at the end of each day, which covers every model in Further Tests.
+
+# Each day is run in rounds, in each of which every driver still able to gives one ride, as in the
+# models. The "sequential" engine does this literally, one giveRide call per driver with a deque per
+# queue. The default "batched" engine keeps every queue in one flat array and runs a whole round with
+# array operations, handing a rider claimed by several drivers to the one earliest in the round. Both
+# serve every waiting rider who has a driver in range, so daily ride counts are identical; the engines
+# only differ in which driver serves a rider and in the order assault draws are made, so assault
+# counts agree in distribution. The sequential engine is kept to check the batched one against.
+
+# The "hybrid" engine skips the rounds. Every waiting rider with a driver in range gets a ride, so the
+# day's rides are just the waiting riders with at least one live (driver, rider) pair, a count over
+# an array. Who serves whom only matters for assaults, i.e. for malicious riders and the riders in
+# range of a malicious driver, so only those riders are given a driver: one of the drivers in range,
+# picked with probability inversely proportional to how many waiting riders that driver has (a driver
+# with a long queue is less likely to reach any one of them first), among the drivers the policy's
+# queueRank puts first for them. Rides are exactly those of the other engines. Assaults are an
+# approximation, not a simulation of the rounds around malicious people: the draw only stands in for
+# who would reach a rider first. hybrid.py measures how far they are from the batched engine's.
+
+# Randomness comes from five numpy.random.Generator streams spawned from one seed: one places the
+# drivers and riders (the geometry), one draws their attributes, one draws each day's riders and
+# pickup orders, one decides assaults and one is kept for the policy's own draws. The day stream uses the same number of draws every day
+# whatever happens on the board, so two boards built from the same seed see the same riders needing
+# rides on the same days and the same pickup order even when they run different policies. That is what lets paired.py compare policies on common random numbers.
+# With no seed, the streams are seeded from the random module, so r.seed() and the replication runner
+# control them the same way they control the models.
+
+# Because the geometry has its own stream, boards that share a seed and the geometry parameters
+# (numDrivers, ridersPer, boardSize, radius) share their geometry whatever their other parameters are.
+# Setting geometryCache to a geometry.GeometryCache, e.g. Board(seed, geometryCache=cache), reuses
+# geometries already built for earlier boards instead of placing everyone and searching for neighbours again.
+
+# Between days a board can be saved to a compressed .npz file with save() and restored with Board.load().
+# The file holds the geometry, the agents' attributes, which (driver, rider) pairs are still in range,
+# the rides, assaults and stale skips so far, the parameters and the states of the day and assault
+# streams, so a restored board carries on exactly as the original would have. runSim() can write such a
+# checkpoint every few days, so a long run that is stopped can be resumed from its last checkpoint.
+
+
+#Turns a seed (None, an int, or a numpy.random.SeedSequence) into a fresh SeedSequence.
+#A SeedSequence is copied, so building several boards from it gives each the same streams.
+def toSeedSequence(seed):
+    if (isinstance(seed, numpy.random.SeedSequence)):
+        return numpy.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size)
+    if (seed is None):
+        seed = r.getrandbits(128)
+    return numpy.random.SeedSequence(seed)
+
+
+#Positions of every entry of the segments [starts[i], starts[i] + counts[i]) of a flat array,
+#segment after segment.
+def segmentPositions(starts, counts):
+    offsets = numpy.cumsum(counts) - counts
+    return numpy.arange(int(counts.sum()), dtype=numpy.int64) + numpy.repeat(starts - offsets, counts)
+
+
+#Order that sorts queue entries by driver, then rank (if any), then pickup-order key. The same as
+#numpy.lexsort((keys, rank, drivers)), but one float sort followed by fast stable integer sorts.
+def queueOrder(drivers, keys, rank=None):
+    order = numpy.argsort(keys)
+    if (rank is not None):
+        order = order[numpy.argsort(rank[order], kind="stable")]
+    return order[numpy.argsort(drivers[order], kind="stable")]
+
+
+class Board:
+    #ADJUSTABLE VARIABLES
+    numDrivers = 1000       #NUMBER OF DRIVERS IN THE SIMULATION
+    numDays = 50            #NUMBER OF DAYS THE SIMULATION RUNS FOR
+    probMalicious = 0.005   #PROBABILITY A DRIVER OR RIDER IS MALICIOUS
+    probAssault = 0.5       #PROBABILITY OF AN ASSAULT DURING A RIDE WITH A MALICIOUS PERSON
+    ridersPer = 22.2        #NUMBER OF RIDERS GENERATED PER DRIVER
+    mTw = 0.95              #PROBABILITY A MALICIOUS MAN TARGETS WOMEN
+    wTm = 0.95              #PROBABILITY A MALICIOUS WOMAN TARGETS MEN
+    pMM = 0.7639            #PROBABILITY A MALICIOUS PERSON IS A MAN
+    driverProbMale = 0.639  #PROBABILITY A DRIVER IS MALE
+    riderProbMale = 0.5     #PROBABILITY A RIDER IS MALE
+    probNeedRide = 0.15516  #PROBABILITY A RIDER NEEDS A RIDE ON A GIVEN DAY
+    radius = 1              #RADIUS A DRIVER CAN GIVE RIDES IN
+    boardSize = 10          #LENGTH OF EACH SIDE OF THE BOARD
+    mPreference = 0.4       #PROBABILITY A NON-MALICIOUS MAN HAS A PREFERRED DRIVER SEX
+    mPw = 0.5               #PROBABILITY A NON-MALICIOUS MAN PREFERS FEMALE DRIVERS
+    wPreference = 0.6       #PROBABILITY A NON-MALICIOUS WOMAN HAS A PREFERRED DRIVER SEX
+    wPw = 0.8               #PROBABILITY A NON-MALICIOUS WOMAN PREFERS FEMALE DRIVERS
+    probOpportunist = 0.5   #PROBABILITY A MALICIOUS RIDER IS OPPORTUNISTIC VS. PREDATORY
+    ridesPerDriverDay = 3.444       #AVERAGE RIDES PER DRIVER PER DAY IN THE REAL WORLD
+    assaultsPerDriver = 0.4033      #AVERAGE ASSAULTS PER DRIVER OVER THE SIMULATION, SCALED UP 1000 TIMES
+    expectedRides = ridesPerDriverDay*numDays*numDrivers    #AVERAGE NUMBER OF RIDES EXPECTED OVER THE COURSE OF THE SIMULATION
+    expectedAssaults = assaultsPerDriver*numDrivers         #AVERAGE NUMBER OF ASSAULTS EXPECTED OVER THE COURSE OF THE SIMULATION
+    engine = "batched"      #"batched" TO RUN EACH ROUND AS ARRAY OPERATIONS, "sequential" TO CALL giveRide FOR EACH DRIVER IN TURN, "hybrid" TO ONLY MATCH RIDERS NEAR MALICIOUS PEOPLE
+    geometryCache = None    #geometry.GeometryCache TO REUSE BUILT GEOMETRIES FROM, OR None TO ALWAYS BUILD THEM
+    profiler = None         #profiler.Profiler TO RECORD PHASE TIMES AND COUNTERS IN, OR None NOT TO PROFILE
+
+    #seed makes the board reproducible. policy is a policies.Policy (the baseline if None).
+    #population lets several boards share one already-built Population; it must have been
+    #built with the same population parameters.
+    def __init__(self, seed=None, policy=None, population=None, **overrides):
+        self.setParameters(overrides)
+        if (self.profiler is not None):
+            self.profiler.start()
+        geometrySeed, populationSeed, daySeed, assaultSeed, policySeed = toSeedSequence(seed).spawn(5)
+        self.rng = numpy.random.default_rng(daySeed)             #DRAWS EACH DAY'S RIDERS AND PICKUP ORDERS
+        self.assaultRng = numpy.random.default_rng(assaultSeed)  #DECIDES WHETHER ASSAULTS HAPPEN
+        self.policyRng = numpy.random.default_rng(policySeed)    #DRAWS MADE BY THE POLICY (VETTING, REROLLS, ...)
+        self.policy = policy if policy is not None else Policy()   #POLICY BEING SIMULATED
+
+        if (population is None):
+            population = Population(self, numpy.random.default_rng(populationSeed), self.findGeometry(geometrySeed))
+        self.basePopulation = population    #THE POPULATION BEFORE THE POLICY CHANGED IT, FOR BUILDING OTHER BOARDS ON
+        self.population = self.policy.adjustPopulation(self, population)     #ATTRIBUTES OF EVERY DRIVER AND RIDER
+        if (self.profiler is not None):
+            self.profiler.lap("population")
+        self.numRiders = self.population.numRiders
+        self.day = 0                #GETTER FOR CURRENT DAY
+        self.assaults = []          #TRACKS ASSAULTS BY DAY
+        self.rides = []             #TRACKS TOTAL RIDES BY DAY
+        self.staleSkips = []        #TRACKS QUEUED RIDERS SKIPPED BECAUSE ANOTHER DRIVER ALREADY SERVED THEM, BY DAY
+        self.needRide = numpy.zeros(self.numRiders, dtype=bool)     #INDICATES IF EACH RIDER NEEDS A RIDE THAT DAY
+        self.generation = 0         #NUMBER OF THE CURRENT DAY'S ACTIVATION, STARTING FROM 1
+        self.waitingGeneration = numpy.zeros(self.numRiders, dtype=numpy.int32)    #A RIDER IS WAITING FOR A RIDE WHEN THIS EQUALS generation
+        self.waitingView = memoryview(self.waitingGeneration)   #THE SAME FLAGS, FOR FAST ONE-AT-A-TIME ACCESS IN THE SEQUENTIAL ENGINE
+        self.numWaiting = 0         #NUMBER OF RIDERS STILL WAITING FOR A RIDE
+        self.activeInRange = [deque() for i in range(self.numDrivers)]   #QUEUE OF ACTIVE RIDERS IN RANGE OF EACH DRIVER
+        self.findRidersInRange()
+        allowed = self.policy.allowedEdges(self)
+        if (allowed is not None):
+            self.edgeAlive &= allowed
+        if (self.profiler is not None):
+            self.profiler.lap("coverage")
+        self.policyState = {}       #ARRAYS THE POLICY KEEPS ON THE BOARD, BY NAME (SAVED WITH THE BOARD)
+        self.policy.setup(self)
+        if (self.profiler is not None):
+            self.profiler.lap("policySetup")
+            self.profiler.endSetup()
+
+    #Object views of the drivers. Built on demand so the board and its views do not
+    #hold each other in a reference cycle, which would keep a finished board in memory
+    #until the garbage collector next ran.
+    @property
+    def setDrivers(self):
+        return AgentList(self, DriverView, self.numDrivers)
+
+    #Object views of the riders.
+    @property
+    def setRiders(self):
+        return AgentList(self, RiderView, self.numRiders)
+
+    #Sets the parameters named in overrides and works out the probabilities derived from them.
+    def setParameters(self, overrides):
+        for name, value in overrides.items():
+            if (not hasattr(type(self), name)):
+                raise TypeError("Board has no parameter named " + repr(name))
+            setattr(self, name, value)
+        self.mTm = 1 - self.mTw              #PROBABILITY A MALICIOUS MAN TARGETS OTHER MEN
+        self.wTw = 1 - self.wTm              #PROBABILITY A MALICIOUS WOMAN TARGETS OTHER WOMEN
+        self.probMaliciousGivenMan = self.probMalicious*self.pMM*2         #PROBABILITY A MAN IS MALICIOUS
+        self.probMaliciousGivenWoman = self.probMalicious*(1-self.pMM)*2   #PROBABILITY A WOMAN IS MALICIOUS
+        self.expectedRides = self.ridesPerDriverDay*self.numDays*self.numDrivers
+        self.expectedAssaults = self.assaultsPerDriver*self.numDrivers
+
+    #Returns the board's geometry, from geometryCache if one is set.
+    def findGeometry(self, seedSequence):
+        numRiders = int(self.ridersPer*self.numDrivers)
+        build = lambda: buildGeometry(numpy.random.default_rng(seedSequence), self.numDrivers, numRiders, self.boardSize, self.radius)
+        if (self.geometryCache is None):
+            return build()
+        return self.geometryCache.get(geometryKey(seedSequence, self), build)
+
+    #Sets up the coverage graph: the geometry's CSR arrays, shared and never changed, plus
+    #edgeAlive, one flag per (driver, rider) edge that an assault clears for good. The
+    #edge number also indexes the pair's daily pickup-order key.
+    def findRidersInRange(self):
+        self.geometry = self.population.geometry        #COORDINATES AND CSR COVERAGE GRAPH
+        self.numEdges = self.geometry.numEdges          #NUMBER OF (DRIVER, RIDER) PAIRS WITHIN RANGE AT THE START
+        self.edgeAlive = numpy.ones(self.numEdges, dtype=bool)      #INDICATES IF EACH EDGE'S PAIR CAN STILL RIDE TOGETHER
+        self.riderLiveDrivers = None    #NUMBER OF LIVE EDGES OF EACH RIDER, KEPT BY THE HYBRID ENGINE ONCE IT HAS RUN A DAY
+
+    #IDs of the riders still in range of a driver.
+    def ridersOf(self, driver):
+        start, end = self.geometry.driverIndptr[driver], self.geometry.driverIndptr[driver + 1]
+        return self.geometry.riderIndices[start:end][self.edgeAlive[start:end]]
+
+    #IDs of the drivers that still have a rider in range.
+    def driversOf(self, rider):
+        start, end = self.geometry.riderIndptr[rider], self.geometry.riderIndptr[rider + 1]
+        return self.geometry.edgeDrivers[start:end][self.edgeAlive[self.geometry.riderEdges[start:end]]]
+
+    #Edge number of each (driver, rider) pair, for parallel arrays of driver and rider IDs.
+    #Each driver's riders are sorted in the CSR arrays, so this is a binary search per pair.
+    def edgesOf(self, drivers, riders):
+        indptr = self.geometry.driverIndptr
+        return numpy.array([indptr[driver] + numpy.searchsorted(self.geometry.riderIndices[indptr[driver]:indptr[driver + 1]], rider)
+                            for driver, rider in zip(drivers.tolist(), riders.tolist())], dtype=numpy.int64)
+
+    #Every live edge of the given riders, as parallel arrays (drivers, riders, edges), rider by
+    #rider, gathered from the rider-major CSR arrays without a Python loop.
+    def activeEdges(self, activeRiders):
+        geometry = self.geometry
+        starts = geometry.riderIndptr[activeRiders]
+        counts = geometry.riderIndptr[activeRiders + 1] - starts
+        positions = segmentPositions(starts, counts)
+        edges = geometry.riderEdges[positions]
+        alive = self.edgeAlive[edges]
+        return geometry.edgeDrivers[positions][alive], numpy.repeat(activeRiders, counts)[alive], edges[alive]
+
+    #Chooses which riders need a ride today and builds each driver's pickup order.
+    #Each active rider is pushed only to the drivers that have them in range, so this
+    #costs (active riders x drivers per rider) rather than a scan of every driver's riders.
+    #Pickup order is a random key per edge, drawn for every edge every day so the number
+    #of draws never depends on what has happened on the board.
+    #Waiting riders are stamped with a new generation number each day, so nothing has to be
+    #cleared between days: yesterday's stamps just stop matching.
+    #draws are the day's (needRide, edgeKeys) from drawDay(), drawn here if None.
+    def nextDay(self, draws=None):
+        needRide, edgeKeys = draws if draws is not None else self.drawDay()
+        allowed = self.policy.activeMask(self)
+        if (allowed is not None):
+            needRide = needRide & allowed
+        self.needRide[:] = needRide
+        activeRiders = numpy.flatnonzero(needRide)
+        self.generation += 1
+        self.waitingGeneration[activeRiders] = self.generation
+        self.numWaiting = len(activeRiders)
+        if (self.profiler is not None):
+            self.profiler.lap("activation")
+        drivers, riders, edges = self.activeEdges(activeRiders)
+        if (self.engine == "sequential"):
+            self.buildQueues(drivers, riders, edgeKeys[edges])
+        else:
+            self.buildFlatQueue(drivers, riders, edges, edgeKeys[edges])
+        if (self.profiler is not None):
+            self.profiler.lap("queues")
+            self.profiler.counts = {"activeRiders": self.numWaiting, "queueEntries": len(edges)}
+
+    #The day stream's draws for one day: which riders need a ride, before the policy's
+    #activeMask, and a pickup-order key for every edge. With edgeKeys False the keys are
+    #skipped over instead of drawn (one 64-bit step per key), so the stream stays where
+    #the other engines leave it, and None is returned in their place.
+    def drawDay(self, edgeKeys=True):
+        needRide = self.rng.random(self.numRiders) < self.probNeedRide
+        if (not edgeKeys):
+            self.rng.bit_generator.advance(self.numEdges)
+            return needRide, None
+        return needRide, self.rng.random(self.numEdges)
+
+    #Number of waiting riders each driver still has in range, counted from the waiting riders'
+    #side of the coverage graph, which is much smaller than the drivers' side.
+    def driverLoads(self):
+        drivers = self.activeEdges(numpy.flatnonzero(self.needRide))[0]
+        return numpy.bincount(drivers, minlength=self.numDrivers)
+
+    #One day of the hybrid engine: counts the rides and gives a driver only to the riders
+    #whose driver can make a difference to assaults (see the top of this file).
+    def runHybridDay(self, draws):
+        needRide = draws[0] if draws is not None else self.drawDay(edgeKeys=False)[0]
+        allowed = self.policy.activeMask(self)
+        if (allowed is not None):
+            needRide = needRide & allowed
+        self.needRide[:] = needRide
+        geometry = self.geometry
+        if (self.riderLiveDrivers is None):
+            self.riderLiveDrivers = numpy.bincount(geometry.riderIndices[self.edgeAlive], minlength=self.numRiders)
+        served = needRide & (self.riderLiveDrivers > 0)
+        numServed = int(served.sum())
+        self.rides[self.day] += numServed
+        self.numWaiting = int(needRide.sum()) - numServed
+        if (self.profiler is not None):
+            self.profiler.lap("activation")
+            self.profiler.counts = {"activeRiders": int(needRide.sum())}
+
+        population = self.population
+        maliciousDrivers = numpy.flatnonzero(population.driverMalicious)
+        starts = geometry.driverIndptr[maliciousDrivers]
+        positions = segmentPositions(starts, geometry.driverIndptr[maliciousDrivers + 1] - starts)
+        nearMalicious = numpy.zeros(self.numRiders, dtype=bool)
+        nearMalicious[geometry.riderIndices[positions[self.edgeAlive[positions]]]] = True
+        riders = numpy.flatnonzero(served & (population.riderMalicious | nearMalicious))
+        if (len(riders) > 0):
+            drivers, riders, edges = self.activeEdges(riders)
+            weights = 1 / self.driverLoads()[drivers]
+            segmentStart = numpy.flatnonzero(numpy.r_[True, riders[1:] != riders[:-1]])
+            segmentLength = numpy.diff(numpy.r_[segmentStart, len(riders)])
+            rank = self.policy.queueRank(self, drivers, riders)
+            if (rank is not None):
+                weights[rank != numpy.repeat(numpy.minimum.reduceat(rank, segmentStart), segmentLength)] = 0
+            cumulative = numpy.cumsum(weights)
+            before = cumulative[segmentStart] - weights[segmentStart]
+            total = cumulative[segmentStart + segmentLength - 1] - before
+            picked = numpy.searchsorted(cumulative, before + self.assaultRng.random(len(segmentStart))*total, side="right")
+            picked = numpy.minimum(picked, segmentStart + segmentLength - 1)
+            order = numpy.argsort(drivers[picked], kind="stable")
+            picked = picked[order]
+            self.resolveAssaults(drivers[picked], riders[picked], edges[picked])
+        if (self.profiler is not None):
+            self.profiler.counts["queueEntries"] = len(riders)
+
+    #Builds a deque per driver of the active riders in range, for the sequential engine,
+    #from the day's live edges and their pickup-order keys.
+    def buildQueues(self, drivers, riders, keys):
+        order = queueOrder(drivers, keys)
+        riderList = riders[order].tolist()
+        starts = numpy.zeros(self.numDrivers + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(drivers, minlength=self.numDrivers), out=starts[1:])
+        starts = starts.tolist()
+        for driver in range(self.numDrivers):
+            queue = riderList[starts[driver]:starts[driver + 1]]
+            self.activeInRange[driver] = deque(self.policy.orderQueue(self, driver, queue))
+
+    #Builds every driver's queue as one flat array, for the batched engine: driver d's
+    #riders, in pickup order, are queueRiders[queueStart[d]:queueStart[d+1]], and
+    #queuePosition[d] is where the driver has got to.
+    def buildFlatQueue(self, drivers, riders, edges, keys):
+        order = queueOrder(drivers, keys, self.policy.queueRank(self, drivers, riders))
+        self.queueRiders = riders[order]        #EVERY DRIVER'S QUEUE OF ACTIVE RIDERS, DRIVER BY DRIVER
+        self.queueEdges = edges[order]          #EDGE NUMBERS MATCHING queueRiders
+        self.queueStart = numpy.zeros(self.numDrivers + 1, dtype=numpy.int64)    #START OF EACH DRIVER'S QUEUE IN queueRiders
+        numpy.cumsum(numpy.bincount(drivers, minlength=self.numDrivers), out=self.queueStart[1:])
+        self.queuePosition = self.queueStart[:-1].copy()    #POSITION OF EACH DRIVER'S NEXT RIDER IN queueRiders
+
+    #One round of the batched engine: every driver in activeDrivers (an array in round
+    #order) gives the next waiting rider in their queue a ride. Riders already served are
+    #skipped and counted in staleSkips. When several drivers reach the same rider, the one
+    #earliest in the round gets them, and the others only try their next rider once every
+    #other driver in the round has claimed theirs. So the day's rides are the same as calling
+    #giveRide for each driver in turn, but not always who serves whom.
+    #Returns the drivers that gave a ride, in round order.
+    def runRound(self, activeDrivers):
+        position = self.queuePosition
+        end = self.queueStart[1:]
+        pending = activeDrivers
+        givers = []
+        riders = []
+        edges = []
+        while (len(pending) > 0):
+            while (True):
+                pending = pending[position[pending] < end[pending]]
+                heads = self.queueRiders[position[pending]]
+                stale = self.waitingGeneration[heads] != self.generation
+                if (not stale.any()):
+                    break
+                self.staleSkips[self.day] += int(stale.sum())
+                position[pending[stale]] += 1
+            if (len(pending) == 0):
+                break
+            claimed, first = numpy.unique(heads, return_index=True)
+            self.waitingGeneration[claimed] = 0
+            givers.append(pending[first])
+            riders.append(claimed)
+            edges.append(self.queueEdges[position[pending[first]]])
+            position[pending[first]] += 1
+            lost = numpy.ones(len(pending), dtype=bool)
+            lost[first] = False
+            pending = pending[lost]
+        if (len(givers) == 0):
+            return activeDrivers[:0]
+        givers = numpy.concatenate(givers)
+        riders = numpy.concatenate(riders)
+        edges = numpy.concatenate(edges)
+        order = numpy.argsort(givers)
+        self.rides[self.day] += len(givers)
+        self.numWaiting -= len(givers)
+        self.resolveAssaults(givers[order], riders[order], edges[order])
+        return givers[order]
+
+    #Returns the ID of the rider the driver gave a ride to.
+    #Returns None if the driver cannot give any more rides that day.
+    #Riders another driver already served are dropped from the queue when they reach
+    #the front, and counted in staleSkips.
+    def giveRide(self, driver):
+        activeInRange = self.activeInRange[driver]
+        while (len(activeInRange) > 0):
+            rider = activeInRange.popleft()
+            if (self.waitingView[rider] == self.generation):
+                self.rides[self.day] += 1
+                self.resolveAssault(driver, rider)
+                return rider
+            self.staleSkips[self.day] += 1
+        return None
+
+    #Decides whether an assault happens on a ride, with the same draws as Driver.giveRide
+    #in the baseline model. An assault removes the rider from the driver's range for good.
+    def resolveAssault(self, driver, rider):
+        population = self.population
+        driverMale = population.driverMale[driver]
+        assaultHappened = False
+        byRider = False
+        if (population.riderMalicious[rider] and driverMale != population.riderTargetWomen[rider]):
+            assaultHappened = byRider = self.assaultRng.random() < self.policy.assaultProbability(self, driver, rider)
+        if (not assaultHappened and population.driverMalicious[driver]
+                and (self.policy.driverAssaultsMaliciousRiders or not population.riderMalicious[rider])
+                and population.riderMale[rider] != population.driverTargetWomen[driver]):
+            assaultHappened = self.assaultRng.random() < self.policy.assaultProbability(self, driver, rider)
+        if (assaultHappened):
+            self.removeFromRange(driver, rider)
+            drivers, riders, byRider = numpy.array([driver]), numpy.array([rider]), numpy.array([byRider])
+            self.countAssaults(drivers, riders, byRider)
+            self.policy.assaulted(self, drivers, riders, byRider)
+        return assaultHappened
+
+    #resolveAssault for a batch of rides, given as parallel arrays of driver and rider IDs
+    #and, if known, their edge numbers.
+    #Only rides with a malicious person and their preferred target can end in an assault,
+    #so the branches are worked out as masks over the batch and assaultRng is only drawn
+    #for the few rides that pass them: first for malicious riders, then for malicious
+    #drivers on the rides that did not already end in an assault (and, if the policy's
+    #driverAssaultsMaliciousRiders is False, whose rider is not malicious).
+    #Returns a boolean array marking the rides that ended in an assault.
+    def resolveAssaults(self, drivers, riders, edges=None):
+        population = self.population
+        driverMale = population.driverMale[drivers]
+        riderMale = population.riderMale[riders]
+        riderEligible = population.riderMalicious[riders] & (driverMale != population.riderTargetWomen[riders])
+        driverEligible = population.driverMalicious[drivers] & (riderMale != population.driverTargetWomen[drivers])
+        assaulted = numpy.zeros(len(drivers), dtype=bool)
+        eligible = numpy.flatnonzero(riderEligible)
+        assaulted[eligible] = self.assaultRng.random(len(eligible)) < self.policy.assaultProbability(self, drivers[eligible], riders[eligible])
+        byRider = assaulted.copy()
+        if (not self.policy.driverAssaultsMaliciousRiders):
+            driverEligible &= ~population.riderMalicious[riders]
+        eligible = numpy.flatnonzero(driverEligible & ~assaulted)
+        assaulted[eligible] = self.assaultRng.random(len(eligible)) < self.policy.assaultProbability(self, drivers[eligible], riders[eligible])
+        numAssaults = int(assaulted.sum())
+        if (numAssaults > 0):
+            self.countAssaults(drivers[assaulted], riders[assaulted], byRider[assaulted])
+            if (edges is None):
+                edges = self.edgesOf(drivers[assaulted], riders[assaulted])
+            else:
+                edges = edges[assaulted]
+            self.edgeAlive[edges] = False
+            if (self.riderLiveDrivers is not None):
+                numpy.subtract.at(self.riderLiveDrivers, riders[assaulted], 1)
+            self.policy.assaulted(self, drivers[assaulted], riders[assaulted], byRider[assaulted])
+        return assaulted
+
+    #Adds assaults to the day's count, given as parallel arrays of the drivers and riders
+    #involved and whether the rider was the one who committed each. Subclasses that keep
+    #other tallies of assaults add to them here.
+    def countAssaults(self, drivers, riders, byRider):
+        self.assaults[self.day] += len(drivers)
+
+    #Takes a (driver, rider) pair out of each other's range.
+    def removeFromRange(self, driver, rider):
+        self.edgeAlive[self.edgesOf(numpy.array([driver]), numpy.array([rider]))] = False
+        if (self.riderLiveDrivers is not None):
+            self.riderLiveDrivers[rider] -= 1
+
+    #Runs a single day: every driver gives one ride per round until no driver
+    #can give a ride or nobody is left waiting. draws are passed on to nextDay().
+    def runDay(self, draws=None):
+        if (self.profiler is not None):
+            self.profiler.start()
+        self.assaults.append(0)
+        self.rides.append(0)
+        self.staleSkips.append(0)
+        rounds = 0
+        activeDrivers = ()
+        if (self.engine == "hybrid"):
+            self.runHybridDay(draws)
+        else:
+            self.nextDay(draws)
+        if (self.engine == "sequential"):
+            activeDrivers = list(range(self.numDrivers))
+            while (len(activeDrivers) > 0 and self.numWaiting > 0):
+                rounds += 1
+                stillActive = []
+                for driver in activeDrivers:
+                    rider = self.giveRide(driver)
+                    if (rider is not None):
+                        self.waitingView[rider] = 0
+                        self.numWaiting -= 1
+                        stillActive.append(driver)
+                activeDrivers = stillActive
+        elif (self.engine == "batched"):
+            activeDrivers = numpy.arange(self.numDrivers)
+            while (len(activeDrivers) > 0 and self.numWaiting > 0):
+                rounds += 1
+                activeDrivers = self.runRound(activeDrivers)
+        if (self.profiler is not None):
+            self.profiler.lap("matching")
+        self.policy.endDay(self)
+        if (self.profiler is not None):
+            self.profiler.lap("endDay")
+            counts = self.profiler.counts
+            if (self.engine != "hybrid"):
+                counts["rounds"] = rounds
+                counts["driversExhausted"] = self.numDrivers - len(activeDrivers)
+            counts["ridersUnserved"] = self.numWaiting
+            self.profiler.endDay(self, counts)
+        self.day += 1
+
+    #Runs the simulation. If checkpointPath is given, the board is saved there
+    #every checkpointEvery days; Board.load(checkpointPath).runSim() resumes it.
+    def runSim(self, checkpointPath=None, checkpointEvery=1):
+        while (self.day < self.numDays):
+            self.runDay()
+            if (checkpointPath is not None and (self.day % checkpointEvery == 0 or self.day == self.numDays)):
+                self.save(checkpointPath)
+
+    #Names and values of the board's parameters: every number set on the class or the board.
+    def parameters(self):
+        names = [name for name in dir(type(self)) if not name.startswith("_")]
+        return {name: getattr(self, name) for name in names if isinstance(getattr(type(self), name), (bool, int, float, str))}
+
+    #Returns the state of the board between days as a dictionary of NumPy arrays.
+    #Subclasses with more state add their arrays to this dictionary and read them
+    #back in setState.
+    def getState(self):
+        state = {}
+        for name, value in vars(self.population.geometry).items():
+            state["geometry." + name] = value
+        for name, value in self.population.arrays().items():
+            state["population." + name] = value
+        state["edgeAlive"] = numpy.packbits(self.edgeAlive)     #ONE BIT PER EDGE
+        state["needRide"] = self.needRide
+        state["day"] = numpy.array(self.day)
+        state["rides"] = numpy.array(self.rides, dtype=numpy.int64)
+        state["assaults"] = numpy.array(self.assaults, dtype=numpy.int64)
+        state["staleSkips"] = numpy.array(self.staleSkips, dtype=numpy.int64)
+        state["boardType"] = numpy.array(type(self).__name__)
+        state["policy"] = numpy.array(self.policy.name)
+        state["parameters"] = numpy.array(json.dumps(self.parameters()))
+        state["rngState"] = numpy.array(json.dumps(self.rng.bit_generator.state))
+        state["assaultRngState"] = numpy.array(json.dumps(self.assaultRng.bit_generator.state))
+        state["policyRngState"] = numpy.array(json.dumps(self.policyRng.bit_generator.state))
+        for name, value in self.policyState.items():
+            state["policyState." + name] = value
+        return state
+
+    #Restores the run state saved by getState onto a board built from the same
+    #geometry, population and parameters. The population arrays are restored too,
+    #since policies may have changed them.
+    def setState(self, state):
+        self.riderLiveDrivers = None
+        self.population = Population.fromArrays(self.geometry, {name[len("population."):]: value for name, value in state.items() if name.startswith("population.")})
+        self.edgeAlive[:] = numpy.unpackbits(state["edgeAlive"], count=self.numEdges).astype(bool)
+        self.needRide[:] = state["needRide"]
+        self.day = int(state["day"])
+        self.rides = state["rides"].tolist()
+        self.assaults = state["assaults"].tolist()
+        self.staleSkips = state["staleSkips"].tolist()
+        self.rng.bit_generator.state = json.loads(str(state["rngState"]))
+        self.assaultRng.bit_generator.state = json.loads(str(state["assaultRngState"]))
+        if ("policyRngState" in state):
+            self.policyRng.bit_generator.state = json.loads(str(state["policyRngState"]))
+        for name in self.policyState:
+            self.policyState[name] = state["policyState." + name]
+
+    #Saves the board to a compressed .npz file. Only valid between days.
+    #The file is written under a temporary name first, so a crash while saving
+    #leaves the previous checkpoint intact.
+    def save(self, path):
+        temporary = path + "." + str(os.getpid()) + ".tmp.npz"
+        numpy.savez_compressed(temporary, **self.getState())
+        os.replace(temporary, path)
+
+    #Restores a board saved with save(). policy must be the policy the board was
+    #running (the baseline if None).
+    @classmethod
+    def load(cls, path, policy=None):
+        with numpy.load(path) as data:
+            state = {name: data[name] for name in data.files}
+        if (str(state["boardType"]) != cls.__name__):
+            raise ValueError(path + " holds a " + str(state["boardType"]) + ", not a " + cls.__name__)
+        policy = policy if policy is not None else Policy()
+        if (str(state["policy"]) != policy.name):
+            raise ValueError(path + " was running the " + str(state["policy"]) + " policy, not " + policy.name)
+        geometry = Geometry(**{name[len("geometry."):]: value for name, value in state.items() if name.startswith("geometry.")})
+        population = Population.fromArrays(geometry, {name[len("population."):]: value for name, value in state.items() if name.startswith("population.")})
+        board = cls(0, policy, population, **json.loads(str(state["parameters"])))
+        board.setState(state)
+        return board
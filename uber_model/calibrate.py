@@ -0,0 +1,186 @@
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy
+
+from . import meanfield
+from .board import Board
+from .runner import mapReplications, spawnSeeds
+
+# Calibration of probMalicious (or probAssault) and probNeedRide against Board.expectedAssaults and
+# Board.expectedRides.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# The parameters of the models were set by hand so that a run averages the real-world rides and
+# assaults scaled to the board (expectedRides and expectedAssaults). Changing numDrivers, radius or
+# the population mix means finding them again. calibrate() does it by stepping between points:
+#   - the starting point is the mean-field estimate (meanfield.py) scaled onto the targets, which is
+#     usually within a few percent already;
+#   - each round runs a batch of replications at the current point, on up to `workers` processes, and
+#     estimates the rides and assaults there from the replications run at that point alone;
+#   - it stops once the 95% confidence interval of the point's assaults (and rides) is within
+#     `tolerance` of the target, or after maxSims replications;
+#   - it moves only once the point's confidence interval of the rides or of the assaults lies outside
+#     half the tolerance of the target, so the noise of a batch is not chased, and a point close
+#     enough to pass is kept until it does. The step takes probNeedRide and `parameter` in proportion to how far the point's
+#     rides and assaults are from the targets. Rides are close to proportional to probNeedRide, and
+#     assaults to probNeedRide and probMalicious (or, less so, probAssault), but not exactly (two
+#     malicious people meeting, pairs removed after an assault), so the step is only a proposal: the
+#     replications of earlier points are never rescaled and counted towards the stopping test.
+# A run's assaults vary by about 25% from replication to replication on the models' board (more on
+# smaller ones), so a tolerance of 5% needs at least about 100 replications at the final point and 2%
+# at least about 600; engine=hybrid makes them several times faster. Every replication is logged as
+# one line of JSON.
+
+# Run as a command, e.g. python -m uber_model.calibrate --set numDrivers=2000 radius=0.8 --tolerance 0.05
+
+PARAMETERS = ["probMalicious", "probAssault"]
+
+
+#Builds and runs one board. Defined at module level so it can run on worker processes.
+#Returns (total rides, total assaults, seconds taken).
+def runCalibrationReplication(seedSequence, overrides):
+    start = time.perf_counter()
+    board = Board(seedSequence, **overrides)
+    board.runSim()
+    return sum(board.rides), sum(board.assaults), time.perf_counter() - start
+
+
+#Finds the value of `parameter` ("probMalicious" or "probAssault") and of probNeedRide at which
+#boards with the given Board parameter overrides average Board.expectedAssaults and expectedRides.
+#batchSize replications are run per round (2 per worker if None), at most maxSims in all.
+#logPath, if given, is a file each replication is appended to as a line of JSON.
+#Returns a dictionary of the parameters found, the estimates of rides and assaults from the
+#replications run at them with their standard errors, the targets, the number of replications run
+#in all and at the final parameters, and whether it converged.
+def calibrate(parameter="probMalicious", tolerance=0.02, workers=None, seed=None, batchSize=None, maxSims=2000,
+              logPath=None, verbose=True, **overrides):
+    if (parameter not in PARAMETERS):
+        raise ValueError("can only calibrate one of " + ", ".join(PARAMETERS) + ", not " + repr(parameter))
+    board = Board.__new__(Board)
+    board.setParameters(overrides)
+    targetRides = board.expectedRides
+    targetAssaults = board.expectedAssaults
+    if (batchSize is None):
+        batchSize = 2*(workers if workers is not None else os.cpu_count())
+
+    #START FROM THE MEAN-FIELD ESTIMATE, SCALED ONTO THE TARGETS
+    rides, assaults = meanfield.estimate(None, **overrides)
+    value = clip(parameter, getattr(board, parameter)*targetAssaults/assaults*rides/targetRides)
+    probNeedRide = min(board.probNeedRide*targetRides/rides, 1.0)
+    if (verbose):
+        print("Mean-field start: " + parameter + " = " + str(value) + ", probNeedRide = " + str(probNeedRide))
+
+    history = []        #(VALUE, probNeedRide, RIDES, ASSAULTS) OF EVERY REPLICATION
+    pointStart = 0      #INDEX IN history OF THE FIRST REPLICATION AT THE CURRENT PARAMETERS
+    previousStart = 0   #THE SAME FOR THE PARAMETERS BEFORE THEM
+    seedSequences = spawnSeeds(seed, maxSims)
+    logFile = open(logPath, "a") if logPath is not None else None
+    try:
+        while (len(history) < maxSims):
+            batch = seedSequences[len(history):len(history) + batchSize]
+            settings = dict(overrides, probNeedRide=probNeedRide, **{parameter: value})
+            argLists = [(seedSequence, settings) for seedSequence in batch]
+            for seedSequence, (simRides, simAssaults, seconds) in zip(batch, mapReplications(runCalibrationReplication, argLists, workers)):
+                history.append((value, probNeedRide, simRides, simAssaults))
+                if (logFile is not None):
+                    logFile.write(json.dumps({"sim": len(history) - 1, "seed": list(seedSequence.spawn_key), parameter: value,
+                                              "probNeedRide": probNeedRide, "rides": int(simRides), "assaults": int(simAssaults),
+                                              "seconds": seconds}) + "\n")
+                    logFile.flush()
+            estimate = pointEstimate(history[pointStart:])
+            if (verbose):
+                print("%d sims, %d at %s = %.6g, probNeedRide = %.6g: rides %.1f +/- %.1f, assaults %.1f +/- %.1f"
+                      % ((len(history), len(history) - pointStart, parameter, value, probNeedRide) + estimate))
+            if (withinTolerance(estimate, targetRides, targetAssaults, tolerance)):
+                break
+            if (not missesTargets(estimate, targetRides, targetAssaults, tolerance/2)):
+                continue
+            #MOVE TO THE PARAMETERS THAT SCALE THE POINT'S MEANS ONTO THE TARGETS
+            value = clip(parameter, value*targetAssaults/estimate[2]*estimate[0]/targetRides)
+            probNeedRide = min(probNeedRide*targetRides/estimate[0], 1.0)
+            previousStart, pointStart = pointStart, len(history)
+    finally:
+        if (logFile is not None):
+            logFile.close()
+    if (pointStart == len(history)):     #STOPPED BEFORE RUNNING THE NEW PARAMETERS, SO REPORT THE LAST ONES RUN
+        pointStart = previousStart
+        value, probNeedRide = history[-1][:2]
+    estimate = pointEstimate(history[pointStart:])
+    return {parameter: value, "probNeedRide": probNeedRide, "rides": estimate[0], "ridesError": estimate[1],
+            "assaults": estimate[2], "assaultsError": estimate[3], "targetRides": targetRides,
+            "targetAssaults": targetAssaults, "sims": len(history), "simsAtParameters": len(history) - pointStart,
+            "converged": withinTolerance(estimate, targetRides, targetAssaults, tolerance)}
+
+
+#Keeps a calibrated probability in range.
+def clip(parameter, value):
+    return min(value, 1.0) if parameter == "probAssault" else min(value, 0.5)
+
+
+#Means of the rides and assaults of the given replications, all run at the same parameters,
+#and their standard errors.
+#Returns (rides, rides standard error, assaults, assaults standard error).
+def pointEstimate(history):
+    values, needs, rides, assaults = (numpy.array(column, dtype=float) for column in zip(*history))
+    n = len(history)
+    ridesError = numpy.std(rides, ddof=1)/math.sqrt(n) if n > 1 else math.inf
+    assaultsError = numpy.std(assaults, ddof=1)/math.sqrt(n) if n > 1 else math.inf
+    return float(numpy.mean(rides)), float(ridesError), float(numpy.mean(assaults)), float(assaultsError)
+
+
+#Whether the 95% confidence intervals of the pooled rides and assaults both lie within
+#`tolerance` (a fraction) of the targets.
+def withinTolerance(estimate, targetRides, targetAssaults, tolerance):
+    rides, ridesError, assaults, assaultsError = estimate
+    return (abs(rides - targetRides) + 1.96*ridesError <= tolerance*targetRides
+            and abs(assaults - targetAssaults) + 1.96*assaultsError <= tolerance*targetAssaults)
+
+
+#Whether the 95% confidence interval of the rides or of the assaults lies wholly outside
+#`tolerance` (a fraction) of the target, so the parameters need to move.
+def missesTargets(estimate, targetRides, targetAssaults, tolerance):
+    rides, ridesError, assaults, assaultsError = estimate
+    return (abs(rides - targetRides) - 1.96*ridesError > tolerance*targetRides
+            or abs(assaults - targetAssaults) - 1.96*assaultsError > tolerance*targetAssaults)
+
+
+#Reads NAME=VALUE command-line overrides as Board parameters of the type they have on Board.
+def parseOverrides(pairs):
+    overrides = {}
+    for pair in pairs:
+        name, separator, text = pair.partition("=")
+        if (not separator or not hasattr(Board, name)):
+            raise SystemExit("not a Board parameter setting: " + repr(pair))
+        kind = type(getattr(Board, name))
+        if (kind not in (int, float, str)):
+            raise SystemExit(name + " cannot be set from the command line")
+        overrides[name] = float(text) if kind is int and "." in text else kind(text)
+    return overrides
+
+
+#MAIN CODE
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrates probMalicious (or probAssault) and probNeedRide against Board.expectedAssaults and expectedRides.")
+    parser.add_argument("--parameter", default="probMalicious", choices=PARAMETERS, help="parameter matched to expectedAssaults")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="largest relative error of the 95%% confidence interval on the targets")
+    parser.add_argument("--set", nargs="*", default=[], metavar="NAME=VALUE", help="Board parameter overrides, e.g. numDrivers=2000 engine=hybrid")
+    parser.add_argument("--workers", type=int, default=None, help="processes to run replications on (all cores by default)")
+    parser.add_argument("--batch", type=int, default=None, help="replications per round (2 per worker by default)")
+    parser.add_argument("--max-sims", type=int, default=2000, help="most replications to run")
+    parser.add_argument("--seed", type=int, default=2112)
+    parser.add_argument("--log", default="calibration.jsonl", help="file every replication is appended to as JSON")
+    args = parser.parse_args()
+
+    result = calibrate(args.parameter, args.tolerance, args.workers, args.seed, args.batch, args.max_sims, args.log, True, **parseOverrides(args.set))
+    print()
+    for name, value in result.items():
+        print(name + " = " + str(value))
+    if (not result["converged"]):
+        print("Did not reach the tolerance within " + str(args.max_sims) + " replications")
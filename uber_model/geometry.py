@@ -0,0 +1,159 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy
+from scipy import spatial
+
+# Board geometry (where everyone is and who is in range of whom) and a cache of built geometries.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# Placing the drivers and riders and finding every rider within range of every driver is most of the
+# cost of building a board, and none of it depends on the behavioural parameters (probAssault,
+# vettingEfficacy, daysUntilReroll, ...) or on the policy. Board draws its geometry from its own random
+# stream, so a geometry is fixed by the seed, numDrivers, ridersPer, boardSize and radius, and any board
+# with the same five can reuse it. GeometryCache keeps recently built geometries in memory, dropping the
+# least recently used one once it holds maxSize of them, and can also save them as .npz files in a
+# directory so other processes and later runs can load them instead of building them.
+
+# The adjacency is stored in compressed sparse row form: the riders in range of driver d are
+# riderIndices[driverIndptr[d]:driverIndptr[d+1]], in increasing order. Position e in riderIndices is
+# edge e. The same edges ordered by rider are kept too: the drivers that have rider i in range are
+# edgeDrivers[riderIndptr[i]:riderIndptr[i+1]] and their edge numbers are riderEdges over the same
+# range. The index arrays are int32 (int64 only past 2^31 edges), so the graph costs 12 bytes per
+# (driver, rider) pair. They are made read-only because every board built from a cached geometry
+# shares them.
+
+
+class Geometry:
+
+    def __init__(self, driverCoords, riderCoords, driverIndptr, riderIndices, riderIndptr, edgeDrivers, riderEdges):
+        self.driverCoords = driverCoords    #COORDINATES OF EACH DRIVER
+        self.riderCoords = riderCoords      #COORDINATES OF EACH RIDER
+        self.driverIndptr = driverIndptr    #START OF EACH DRIVER'S RIDERS IN riderIndices
+        self.riderIndices = riderIndices    #RIDER IDS IN RANGE OF EACH DRIVER, DRIVER BY DRIVER
+        self.riderIndptr = riderIndptr      #START OF EACH RIDER'S DRIVERS IN edgeDrivers AND riderEdges
+        self.edgeDrivers = edgeDrivers      #DRIVER IDS THAT HAVE EACH RIDER IN RANGE, RIDER BY RIDER
+        self.riderEdges = riderEdges        #EDGE NUMBERS MATCHING edgeDrivers
+        for value in vars(self).values():
+            value.flags.writeable = False
+
+    @property
+    def numDrivers(self):
+        return len(self.driverCoords)
+
+    @property
+    def numRiders(self):
+        return len(self.riderCoords)
+
+    @property
+    def numEdges(self):
+        return len(self.riderIndices)
+
+    #Total number of bytes held by the geometry arrays.
+    @property
+    def nbytes(self):
+        return sum(value.nbytes for value in vars(self).values())
+
+    def save(self, path):
+        numpy.savez(path, **vars(self))
+
+    @classmethod
+    def load(cls, path):
+        with numpy.load(path) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+
+#Places numDrivers drivers and numRiders riders uniformly on the board and finds the riders
+#within radius of each driver.
+def buildGeometry(rng, numDrivers, numRiders, boardSize, radius):
+    driverCoords = rng.uniform(0, boardSize, (numDrivers, 2)).astype(numpy.float32)
+    riderCoords = rng.uniform(0, boardSize, (numRiders, 2)).astype(numpy.float32)
+    return findInRange(driverCoords, riderCoords, radius)
+
+
+#Builds the geometry of drivers and riders already placed at the given coordinates.
+#The neighbour search returns Python lists, so it is run on chunkSize drivers at a time
+#and each chunk is packed into an array straight away.
+def findInRange(driverCoords, riderCoords, radius, chunkSize=128):
+    numDrivers = len(driverCoords)
+    numRiders = len(riderCoords)
+    tree = spatial.cKDTree(riderCoords)
+    countChunks = []
+    riderChunks = []
+    for start in range(0, numDrivers, chunkSize):
+        found = tree.query_ball_point(driverCoords[start:start + chunkSize], radius, return_sorted=True)
+        counts = numpy.fromiter((len(riders) for riders in found), dtype=numpy.int64, count=len(found))
+        countChunks.append(counts)
+        riderChunks.append(numpy.fromiter((rider for riders in found for rider in riders), dtype=numpy.int32, count=int(counts.sum())))
+    counts = numpy.concatenate(countChunks) if numDrivers > 0 else numpy.zeros(0, dtype=numpy.int64)
+    riderIndices = numpy.concatenate(riderChunks) if numDrivers > 0 else numpy.zeros(0, dtype=numpy.int32)
+    numEdges = len(riderIndices)
+    indexType = numpy.int32 if numEdges < 2**31 else numpy.int64
+    driverIndptr = numpy.zeros(numDrivers + 1, dtype=indexType)
+    numpy.cumsum(counts, out=driverIndptr[1:])
+    riderEdges = numpy.argsort(riderIndices, kind="stable").astype(indexType)
+    edgeDrivers = numpy.repeat(numpy.arange(numDrivers, dtype=numpy.int32), counts)[riderEdges]
+    riderIndptr = numpy.zeros(numRiders + 1, dtype=indexType)
+    numpy.cumsum(numpy.bincount(riderIndices, minlength=numRiders), out=riderIndptr[1:])
+    return Geometry(driverCoords, riderCoords, driverIndptr, riderIndices, riderIndptr, edgeDrivers, riderEdges)
+
+
+#The cache key for a geometry built from seedSequence on a board with the given parameters.
+def geometryKey(seedSequence, board):
+    return (seedSequence.entropy, tuple(seedSequence.spawn_key), board.numDrivers, board.ridersPer, board.boardSize, board.radius)
+
+
+class GeometryCache:
+
+    #maxSize is the number of geometries kept in memory. directory, if given, is where
+    #geometries are saved as .npz files and looked for before building a new one.
+    def __init__(self, maxSize=8, directory=None):
+        self.maxSize = maxSize          #NUMBER OF GEOMETRIES KEPT IN MEMORY
+        self.directory = directory      #FOLDER FOR .npz FILES, OR None TO KEEP GEOMETRIES IN MEMORY ONLY
+        self.geometries = OrderedDict() #CACHED GEOMETRIES, LEAST RECENTLY USED FIRST
+        self.hits = 0                   #LOOKUPS FOUND IN MEMORY
+        self.diskHits = 0               #LOOKUPS LOADED FROM DISK
+        self.misses = 0                 #LOOKUPS THAT HAD TO BUILD THE GEOMETRY
+        if (directory is not None):
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self.geometries)
+
+    #Only the settings travel to worker processes; each process fills its own memory cache.
+    def __getstate__(self):
+        state = dict(vars(self))
+        state["geometries"] = OrderedDict()
+        return state
+
+    def path(self, key):
+        return os.path.join(self.directory, "geometry_" + hashlib.sha1(repr(key).encode()).hexdigest() + ".npz")
+
+    #Returns the geometry stored under key, calling build() to make it if it is not
+    #in memory or on disk.
+    def get(self, key, build):
+        if (key in self.geometries):
+            self.hits += 1
+            self.geometries.move_to_end(key)
+            return self.geometries[key]
+        geometry = None
+        if (self.directory is not None and os.path.exists(self.path(key))):
+            geometry = Geometry.load(self.path(key))
+            self.diskHits += 1
+        if (geometry is None):
+            geometry = build()
+            self.misses += 1
+            if (self.directory is not None):
+                temporary = self.path(key) + "." + str(os.getpid()) + ".tmp.npz"
+                geometry.save(temporary)
+                os.replace(temporary, self.path(key))
+        self.geometries[key] = geometry
+        while (len(self.geometries) > self.maxSize):
+            self.geometries.popitem(last=False)
+        return geometry
+
+    def clear(self):
+        self.geometries.clear()
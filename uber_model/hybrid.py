@@ -0,0 +1,76 @@
+import math
+import time
+
+import numpy
+import scipy
+from scipy import stats
+
+from .board import Board
+from .paired import pairedTest
+from .runner import mapReplications, spawnSeeds
+
+# Checks of the hybrid engine against the batched one.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# Board(engine="hybrid") counts every day's rides without running the rounds, and only picks a driver
+# for the riders whose driver can make a difference to assaults (see the top of board.py). Its rides are
+# the batched engine's exactly, seed for seed, since both draw the same riders from the same stream.
+# Its assaults are an approximation: the driver of each of those riders is drawn, weighted by how few
+# riders the driver has waiting, rather than found by simulating the rounds around malicious people.
+# compareEngines runs both engines on the same seeds, so printEngineComparison compares the assault
+# totals seed by seed, with a paired t-test (paired.pairedTest) and a confidence interval of the mean
+# difference, and reports how much faster the hybrid engine is. Building the board takes the same time
+# in both, so the speedup is given both for the simulated days alone and for whole replications; on the
+# models' board it measured about 12x and 6.5x.
+
+
+#Builds and runs one board on the given engine. Defined at module level so it can run on worker
+#processes. Returns (total rides, total assaults, seconds building the board, seconds simulating).
+def runEngineReplication(seedSequence, policy, engine, boardType, overrides):
+    start = time.perf_counter()
+    board = boardType(seedSequence, policy, engine=engine, **overrides)
+    built = time.perf_counter()
+    board.runSim()
+    return sum(board.rides), sum(board.assaults), built - start, time.perf_counter() - built
+
+
+#Runs numSims replications of a policy (the baseline if None) on both the batched and the hybrid
+#engine, with the same seeds, on up to `workers` processes. Extra keyword arguments are boardType
+#parameter overrides. Returns a dictionary, by engine, of the lists "rides", "assaults",
+#"buildSeconds" and "simSeconds".
+def compareEngines(numSims=50, workers=None, seed=None, policy=None, boardType=Board, verbose=True, **overrides):
+    seedSequences = spawnSeeds(seed, numSims)
+    results = {}
+    for engine in ("batched", "hybrid"):
+        argLists = [(seedSequence, policy, engine, boardType, overrides) for seedSequence in seedSequences]
+        results[engine] = {"rides": [], "assaults": [], "buildSeconds": [], "simSeconds": []}
+        for i, values in enumerate(mapReplications(runEngineReplication, argLists, workers)):
+            if (verbose):
+                print(engine + " simulation " + str(i + 1) + " complete! ")
+            for name, value in zip(("rides", "assaults", "buildSeconds", "simSeconds"), values):
+                results[engine][name].append(value)
+    return results
+
+
+#Prints how close the hybrid engine's totals are to the batched engine's, and how much faster it is.
+def printEngineComparison(results, alpha=0.05):
+    batched = results["batched"]
+    hybrid = results["hybrid"]
+    for engine in ("batched", "hybrid"):
+        print(engine + " rides: " + str(numpy.mean(results[engine]["rides"])) + " (sd " + str(numpy.std(results[engine]["rides"], ddof=1)) + ")"
+              + ", assaults: " + str(numpy.mean(results[engine]["assaults"])) + " (sd " + str(numpy.std(results[engine]["assaults"], ddof=1)) + ")")
+    print("largest difference in a replication's rides: " + str(numpy.max(numpy.abs(numpy.subtract(hybrid["rides"], batched["rides"])))))
+    test = pairedTest(batched["assaults"], hybrid["assaults"])
+    n = len(batched["assaults"])
+    halfWidth = scipy.stats.t.ppf(1 - alpha/2, n - 1) * test["stdDifference"] / math.sqrt(n)
+    meanBatched = numpy.mean(batched["assaults"])
+    print("assaults, paired t-test of equal means: P_value = " + str(test["pValue"]) + ", Reject Ho = " + str((test["pValue"] < alpha)))
+    print("mean difference in assaults (hybrid - batched): " + str(test["meanDifference"]) + " +/- " + str(halfWidth)
+          + " (" + str(100*(1 - alpha)) + "% confidence interval), " + str(100*test["meanDifference"]/meanBatched) + "% +/- "
+          + str(100*halfWidth/meanBatched) + "% of the batched mean")
+    simSpeedup = numpy.sum(batched["simSeconds"]) / numpy.sum(hybrid["simSeconds"])
+    totalSpeedup = (numpy.sum(batched["simSeconds"]) + numpy.sum(batched["buildSeconds"])) / (numpy.sum(hybrid["simSeconds"]) + numpy.sum(hybrid["buildSeconds"]))
+    print("speedup of the simulated days: " + str(simSpeedup) + "x, of whole replications: " + str(totalSpeedup) + "x")
+    print()
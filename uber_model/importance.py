@@ -0,0 +1,131 @@
+import numpy
+import scipy
+from scipy import stats
+
+from .board import Board
+from .runner import mapReplications, spawnSeeds
+
+# Importance sampling of assaults at real-world rates.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# The models scale the real rate of assaults (3045 in 1.3 billion rides, about 0.4 per 50-day run of
+# 1000 drivers) up 1000 times by making people 1000 times as likely to be malicious, so that there is
+# something to count. Simulating the real rate directly gives a run with no assaults at all most of the
+# time, and a mean that takes an enormous number of runs to pin down.
+
+# ImportanceBoard takes the real probability of being malicious (realProbMalicious), but still draws
+# malicious people with the inflated probMalicious, so assaults happen as often as in the models. Each
+# assault is then counted with the likelihood ratio of its perpetrator: how much likelier their being
+# malicious, with the target they have, is at real rates than in the simulation. Every assault is
+# committed by exactly one malicious person, and what a malicious person does (whom they ride with,
+# the 50% chance of an assault, never riding again with someone they assaulted) does not depend on
+# how many others are malicious, so the weighted count is an unbiased estimate of the real number of
+# assaults, up to the rare rides where two malicious people meet. Those are probMalicious as rare as
+# rides with one, so the bias is well under 1% at the models' 0.005.
+
+# With sampleTargetWomen set, malicious people are also drawn targeting women with that probability
+# instead of mTw (men) or wTw (women), and the weights correct for it. Setting it to 0.5 simulates the
+# rare same-sex targets 10 times as often, which tightens the estimate when they matter, e.g. under
+# sex segregation, where they commit every assault.
+
+
+class ImportanceBoard(Board):
+    #ADJUSTABLE VARIABLES
+    realProbMalicious = 0.000005        #REAL-WORLD PROBABILITY A DRIVER OR RIDER IS MALICIOUS (probMalicious SCALED DOWN 1000 TIMES)
+    realAssaultsPerDriver = 0.0004033   #REAL-WORLD AVERAGE ASSAULTS PER DRIVER OVER THE SIMULATION
+    sampleTargetWomen = None            #PROBABILITY A SIMULATED MALICIOUS PERSON TARGETS WOMEN, OR None TO USE mTw AND wTw
+
+    def __init__(self, seed=None, policy=None, population=None, **overrides):
+        super().__init__(seed, policy, population, **overrides)
+        self.weightedAssaults = []      #TRACKS ASSAULTS BY DAY, EACH WEIGHTED BY ITS PERPETRATOR'S LIKELIHOOD RATIO
+
+    #Works out the sampling probabilities and the likelihood ratio of each kind of malicious
+    #person. mTw and wTw are the real ones; the simulation draws with sampleTargetWomen.
+    def setParameters(self, overrides):
+        super().setParameters(overrides)
+        self.realMTw = self.mTw     #REAL PROBABILITY A MALICIOUS MAN TARGETS WOMEN
+        self.realWTw = self.wTw     #REAL PROBABILITY A MALICIOUS WOMAN TARGETS WOMEN
+        if (self.sampleTargetWomen is not None):
+            if (not 0 < self.sampleTargetWomen < 1):
+                raise ValueError("sampleTargetWomen must be strictly between 0 and 1, not " + str(self.sampleTargetWomen))
+            self.mTw = self.wTw = self.sampleTargetWomen
+            self.mTm = 1 - self.mTw
+        scale = self.realProbMalicious / self.probMalicious
+        #LIKELIHOOD RATIO OF A MALICIOUS PERSON, INDEXED BY [male, targetWomen]
+        self.assaultWeights = numpy.array([
+            [scale*(1 - self.realWTw)/(1 - self.wTw), scale*self.realWTw/self.wTw],
+            [scale*(1 - self.realMTw)/(1 - self.mTw), scale*self.realMTw/self.mTw]])
+        self.realExpectedAssaults = self.realAssaultsPerDriver*self.numDrivers
+
+    #The parameters as given, with the real mTw rather than the one being sampled.
+    def parameters(self):
+        parameters = super().parameters()
+        parameters["mTw"] = self.realMTw
+        parameters["sampleTargetWomen"] = self.sampleTargetWomen
+        return parameters
+
+    def runDay(self, draws=None):
+        self.weightedAssaults.append(0.0)
+        super().runDay(draws)
+
+    def countAssaults(self, drivers, riders, byRider):
+        super().countAssaults(drivers, riders, byRider)
+        population = self.population
+        male = numpy.where(byRider, population.riderMale[riders], population.driverMale[drivers])
+        targetWomen = numpy.where(byRider, population.riderTargetWomen[riders], population.driverTargetWomen[drivers])
+        self.weightedAssaults[self.day] += float(self.assaultWeights[male.astype(int), targetWomen.astype(int)].sum())
+
+    def getState(self):
+        state = super().getState()
+        state["weightedAssaults"] = numpy.array(self.weightedAssaults, dtype=float)
+        return state
+
+    def setState(self, state):
+        super().setState(state)
+        self.weightedAssaults = state["weightedAssaults"].tolist()
+
+
+#Builds and runs one ImportanceBoard. Defined at module level so it can run on worker processes.
+#Returns (total rides, total weighted assaults, total simulated assaults).
+def runImportanceReplication(seedSequence, policy, overrides):
+    board = ImportanceBoard(seedSequence, policy, **overrides)
+    board.runSim()
+    return sum(board.rides), sum(board.weightedAssaults), sum(board.assaults)
+
+
+#Runs numSims ImportanceBoard replications of a policy (the baseline if None) on up to
+#`workers` processes. Extra keyword arguments are ImportanceBoard parameter overrides.
+#Returns the lists (total_rides, total_weighted_assaults, total_simulated_assaults).
+def runImportance(numSims=50, workers=None, seed=None, policy=None, verbose=True, **overrides):
+    total_rides = []
+    total_weighted_assaults = []
+    total_simulated_assaults = []
+    argLists = [(seedSequence, policy, overrides) for seedSequence in spawnSeeds(seed, numSims)]
+    for i, (rides, weighted, simulated) in enumerate(mapReplications(runImportanceReplication, argLists, workers)):
+        if (verbose):
+            print("Simulation " + str(i + 1) + " complete! ")
+        total_rides.append(rides)
+        total_weighted_assaults.append(weighted)
+        total_simulated_assaults.append(simulated)
+    return total_rides, total_weighted_assaults, total_simulated_assaults
+
+
+#Prints the importance sampling estimate of real-world assaults per simulation and tests it
+#against the expected number, in the same layout as the significance tests in the models.
+def printImportanceTest(weightedAssaults, expected, alpha=0.05):
+    weightedAssaults = numpy.asarray(weightedAssaults, dtype=float)
+    n = len(weightedAssaults)
+    mean = numpy.mean(weightedAssaults)
+    standardError = numpy.std(weightedAssaults, ddof=1) / numpy.sqrt(n)
+    s, p = scipy.stats.ttest_1samp(weightedAssaults, expected, alternative="two-sided")
+    print("Real-world assaults (importance sampling): ")
+    print("Ho: mu = " + str(expected))
+    print("Ha: mu != " + str(expected))
+    print("Significance level = " + str(alpha))
+    print("estimated assaults per sim: " + str(mean) + " +/- " + str(scipy.stats.t.ppf(1 - alpha/2, n - 1) * standardError))
+    print("relative standard error: " + str(standardError / mean if mean > 0 else float("nan")))
+    print("P_value = " + str(p))
+    print("Reject Ho = " + str((p < alpha)))
+    print()
@@ -0,0 +1,306 @@
+import math
+
+import numpy
+
+from .board import Board
+from .policies import (Policy, RiderChoice, RiderAccountability, SafetyMeasures, DriverVetting, MoreWomenDrivers,
+                       SexSegregation, OptOutSegregation, DriverAccountability)
+
+# Mean-field estimates of a model's expected rides and assaults, without simulating it.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# estimate(policy, **overrides) gives the expected total rides and assaults of one simulation, the
+# numbers a 50-simulation run averages to, in a few milliseconds. It works from the Board parameters
+# alone, treating every kind of driver and rider as a share of the population instead of as agents:
+#   rides    - riders of each kind need a ride with probability probNeedRide and get one if any driver
+#              they can ride with is in range. The chance of that is worked out from the area of the
+#              board within one radius of each point (less near the edges and corners), so the
+#              coverage of the board is exact rather than assumed.
+#   drivers  - who serves a rider follows the hybrid engine's rule (board.py): a rider goes to each
+#              driver sex in proportion to the number of drivers of that sex over the waiting riders
+#              each of them has to choose from. Under RiderChoice, drivers pick compatible riders first
+#              and every driver gives a ride each round, so riders who ask for a sex get it while that
+#              sex has rides to give, and riders without a preference take the rest.
+#   assaults - a ride ends in an assault with probability probAssault when the rider, or the driver,
+#              is malicious and targets the other one's sex. An assault takes the pair out of each
+#              other's range, and a malicious rider only has about 11 drivers of a sex in range, so
+#              the targets each malicious person has already assaulted are taken out of their pool
+#              (which brings the baseline's rider assaults down by about 5%).
+# Models with timers (driver and rider accountability) are run day by day as expected numbers of
+# drivers or riders in each state of the timer. Two malicious people in one car are left out, as are
+# the pairs a redrawn driver has lost, since drivers are redrawn within days of their first assault.
+
+# MAIN_RUNS holds the means of the runs in the_main_runs.txt, and printMainRunErrors() compares the
+# estimates with them. The driver vetting run is not comparable: Uber_Model_driver_vetting.py vets the
+# riders instead of the drivers (a bug DriverVetting fixes), so it is printed but left out of the errors.
+
+#(NAME, POLICY, MEAN RIDES, ITS STANDARD ERROR, MEAN ASSAULTS, ITS STANDARD ERROR) OF EACH RUN IN the_main_runs.txt
+MAIN_RUNS = [
+    ("baseline", Policy(), 172184.86, 44.2, 408.28, 14.1),
+    ("choice", RiderChoice(driverAssaultsMaliciousRiders=False), 172265.8, 43.3, 453.6, 12.5),
+    ("safety", SafetyMeasures(0.4), 172265.76, 50.3, 335.72, 11.3),
+    ("driver vetting", DriverVetting(0.5), 172164.1, 53.7, 341.94, 14.5),
+    ("half women drivers", MoreWomenDrivers(0.5), 172297.0, 48.4, 433.56, 13.1),
+    ("all women drivers", MoreWomenDrivers(0.0), 172264.92, 60.9, 428.36, 13.4),
+    ("sex segregation", SexSegregation(), 172198.16, 54.6, 52.52, 8.6),
+    ("driver accountability 1", DriverAccountability(1), 172214.88, 58.0, 189.2, 3.5),
+    ("driver accountability 3", DriverAccountability(3), 172172.3, 54.9, 194.14, 3.5),
+    ("driver accountability 10", DriverAccountability(10), 172293.5, 63.6, 229.22, 5.0),
+    ("rider accountability 1", RiderAccountability(1, 1), 172222.8, 42.8, 421.42, 14.2),
+    ("rider accountability 3", RiderAccountability(3, 3), 172126.7, 52.5, 419.88, 14.5),
+    ("rider accountability 5", RiderAccountability(5, 5), 172232.14, 52.7, 385.8, 15.5),
+    ("opt-out segregation", OptOutSegregation(0.3, 0.7), 172168.34, 53.9, 267.3, 8.6),
+]
+
+#RUNS OF MAIN_RUNS WHOSE SCRIPT DOES NOT MATCH THE POLICY, WITH THE REASON
+NOT_COMPARABLE = {"driver vetting": "the script vets riders, not drivers"}
+
+GRID = 64       #POINTS ALONG EACH SIDE OF THE GRID THE BOARD'S COVERAGE IS AVERAGED OVER
+
+#POLICY CLASSES estimate() COVERS
+POLICIES = (Policy, RiderChoice, RiderAccountability, SafetyMeasures, DriverVetting, MoreWomenDrivers, SexSegregation,
+            OptOutSegregation, DriverAccountability)
+
+
+#Area of the disc of the given radius around each point (x, y) that lies on the board. Only the
+#nearest side in each direction can cut the disc, since the radius is at most half the board.
+def discAreaOnBoard(x, y, radius, boardSize):
+    dx = numpy.minimum(numpy.minimum(x, boardSize - x), radius)
+    dy = numpy.minimum(numpy.minimum(y, boardSize - y), radius)
+    segment = lambda d: radius**2*numpy.arccos(d/radius) - d*numpy.sqrt(radius**2 - d**2)
+    primitive = lambda u: (u*numpy.sqrt(numpy.maximum(radius**2 - u**2, 0)) + radius**2*numpy.arcsin(numpy.minimum(u/radius, 1)))/2
+    reach = numpy.sqrt(numpy.maximum(radius**2 - dy**2, 0))
+    corner = numpy.where(dx**2 + dy**2 < radius**2, primitive(reach) - primitive(dx) - dy*(reach - dx), 0)
+    return math.pi*radius**2 - segment(dx) - segment(dy) + corner
+
+
+#Average area of the board within one radius of a point placed uniformly on it.
+def meanAreaInRange(radius, boardSize):
+    points = (numpy.arange(GRID) + 0.5)*boardSize/GRID
+    return float(numpy.mean(discAreaOnBoard(points[:, None], points[None, :], radius, boardSize)))
+
+
+#Share of targets left in a pool of `size` people, `share` of them targets, once `removed` of
+#the targets can no longer be reached.
+def targetsLeft(share, size, removed):
+    return numpy.clip((share*size - removed)/numpy.maximum(size - removed, 1), 0, 1)
+
+
+#Probability that a rider placed uniformly on the board has at least one of numDrivers drivers,
+#placed uniformly, in range, when only a share of the drivers can give them a ride.
+def coverage(numDrivers, share, radius, boardSize):
+    if (radius > boardSize/2):
+        raise ValueError("the mean-field coverage needs a radius of at most half the board, not " + str(radius))
+    points = (numpy.arange(GRID) + 0.5)*boardSize/GRID
+    area = discAreaOnBoard(points[:, None], points[None, :], radius, boardSize)
+    return float(numpy.mean(1 - (1 - share*area/boardSize**2)**numDrivers))
+
+
+#Shares of the drivers of each kind, as a list of (male, malicious, targetWomen, share).
+def driverKinds(board, driverProbMale, caught=0.0):
+    kinds = []
+    for male, probMale, probMalicious, probTargetWomen in ((True, driverProbMale, board.probMaliciousGivenMan, board.mTw),
+                                                           (False, 1 - driverProbMale, board.probMaliciousGivenWoman, board.wTw)):
+        malicious = probMalicious*(1 - caught)
+        kinds.append((male, False, False, probMale*(1 - malicious)))
+        kinds.append((male, True, True, probMale*malicious*probTargetWomen))
+        kinds.append((male, True, False, probMale*malicious*(1 - probTargetWomen)))
+    return kinds
+
+
+#Shares of the riders of each kind, as a list of dictionaries with the rider's male, malicious and
+#targetWomen, their share of the riders, the driver sexes they can ride with (allowMale,
+#allowFemale) and, under RiderChoice, the driver sex they ask for first (prefersMale, None for none).
+def riderKinds(board, policy):
+    kinds = []
+    for male, probMalicious, probTargetWomen in ((True, board.probMaliciousGivenMan, board.mTw),
+                                                 (False, board.probMaliciousGivenWoman, board.wTw)):
+        probMale = board.riderProbMale if male else 1 - board.riderProbMale
+        for malicious, targetWomen, share in ((False, False, 1 - probMalicious), (True, True, probMalicious*probTargetWomen),
+                                              (True, False, probMalicious*(1 - probTargetWomen))):
+            kinds.append({"male": male, "malicious": malicious, "targetWomen": targetWomen, "share": probMale*share,
+                          "allowMale": True, "allowFemale": True, "prefersMale": None})
+    if (isinstance(policy, SexSegregation)):
+        for kind in kinds:
+            kind["allowMale"], kind["allowFemale"] = kind["male"], not kind["male"]
+    elif (isinstance(policy, OptOutSegregation)):
+        split = []
+        for kind in kinds:
+            if (kind["malicious"]):
+                segregated = 1.0 if kind["targetWomen"] != kind["male"] else 0.0
+            else:
+                segregated = policy.probSegregatedGivenMale if kind["male"] else policy.probSegregatedGivenFemale
+            split.append(dict(kind, share=kind["share"]*(1 - segregated)))
+            split.append(dict(kind, share=kind["share"]*segregated, allowMale=kind["male"], allowFemale=not kind["male"]))
+        kinds = split
+    elif (isinstance(policy, RiderChoice)):
+        split = []
+        for kind in kinds:
+            if (kind["malicious"]):
+                split.append(dict(kind, share=kind["share"]*board.probOpportunist))
+                split.append(dict(kind, share=kind["share"]*(1 - board.probOpportunist), prefersMale=not kind["targetWomen"]))
+            else:
+                probPreference, probPrefersWomen = (board.mPreference, board.mPw) if kind["male"] else (board.wPreference, board.wPw)
+                split.append(dict(kind, share=kind["share"]*(1 - probPreference)))
+                split.append(dict(kind, share=kind["share"]*probPreference*probPrefersWomen, prefersMale=False))
+                split.append(dict(kind, share=kind["share"]*probPreference*(1 - probPrefersWomen), prefersMale=True))
+        kinds = split
+    return [kind for kind in kinds if kind["share"] > 0]
+
+
+#Probability that a rider of each kind needs a ride on a given day and has a driver they can ride
+#with in range.
+def rideProbabilities(board, riders, driverProbMale):
+    probabilities = numpy.zeros(len(riders))
+    for i, kind in enumerate(riders):
+        share = driverProbMale*kind["allowMale"] + (1 - driverProbMale)*kind["allowFemale"]
+        if (share > 0):
+            probabilities[i] = board.probNeedRide*coverage(board.numDrivers, share, board.radius, board.boardSize)
+    return probabilities
+
+
+#Which driver sex serves the day's expected rides of each kind of rider.
+#Returns (probMale, driverRides): the probability each kind of rider is served by a man, and the
+#expected rides each male and each female driver gives.
+def assignDrivers(board, riders, rides, driverProbMale, policy):
+    driverShare = {True: driverProbMale, False: 1 - driverProbMale}
+    probMale = numpy.zeros(len(riders))
+    if (isinstance(policy, RiderChoice)):
+        #EVERY DRIVER GIVES A RIDE EACH ROUND, SO EACH SEX HAS ITS SHARE OF THE RIDES TO GIVE
+        capacity = {male: driverShare[male]*rides.sum() for male in (True, False)}
+        for male in (True, False):
+            asking = [i for i, kind in enumerate(riders) if kind["prefersMale"] == male]
+            demand = rides[asking].sum()
+            served = min(demand, capacity[male])
+            probMale[asking] = served/demand if male else 1 - served/demand
+            capacity[male] -= served
+            capacity[not male] -= demand - served
+        rest = [i for i, kind in enumerate(riders) if kind["prefersMale"] is None]
+        total = capacity[True] + capacity[False]
+        probMale[rest] = capacity[True]/total if total > 0 else driverProbMale
+    else:
+        #EACH DRIVER SEX IS WEIGHTED BY ITS DRIVERS OVER THE WAITING RIDERS EACH OF THEM CAN TAKE
+        allowed = {male: numpy.array([kind["allowMale" if male else "allowFemale"] for kind in riders]) for male in (True, False)}
+        weight = {}
+        for male in (True, False):
+            load = rides[allowed[male]].sum()
+            weight[male] = driverShare[male]/load if load > 0 else 0.0
+        male = weight[True]*allowed[True]
+        female = weight[False]*allowed[False]
+        probMale = numpy.where(male + female > 0, male/numpy.maximum(male + female, 1e-300), 0.0)
+    driverRides = {}
+    for male in (True, False):
+        numSex = board.numDrivers*driverShare[male]
+        served = rides*(probMale if male else 1 - probMale)
+        driverRides[male] = served.sum()/numSex if numSex > 0 else 0.0
+    return probMale, driverRides
+
+
+#Expected total rides and assaults of one simulation of the policy (the baseline if None), with the
+#given Board parameter overrides, as (total rides, total assaults): the totals each simulation of a
+#model reports, so they can be compared with a run's means.
+def estimate(policy=None, **overrides):
+    policy = policy if policy is not None else Policy()
+    if (type(policy) not in POLICIES):
+        raise TypeError("no mean-field estimate for the " + type(policy).__name__ + " policy")
+    board = Board.__new__(Board)
+    board.setParameters(overrides)
+    probAssault = policy.probAssault if isinstance(policy, SafetyMeasures) else board.probAssault
+    driverProbMale = policy.driverProbMale if isinstance(policy, MoreWomenDrivers) else board.driverProbMale
+    caught = policy.vettingEfficacy if isinstance(policy, DriverVetting) else 0.0
+    riders = riderKinds(board, policy)
+    numRiders = int(board.ridersPer*board.numDrivers)
+    riderCounts = numRiders*numpy.array([kind["share"] for kind in riders])
+    rideProbability = rideProbabilities(board, riders, driverProbMale)
+    riderMalicious = numpy.array([kind["malicious"] for kind in riders])
+    riderTargetWomen = numpy.array([kind["targetWomen"] for kind in riders])
+    malicious = [(male, targetWomen, share) for male, isMalicious, targetWomen, share in driverKinds(board, driverProbMale, caught) if isMalicious]
+    inRange = meanAreaInRange(board.radius, board.boardSize)/board.boardSize**2
+    #DRIVERS EACH KIND OF RIDER CAN RIDE WITH IN RANGE, AND RIDERS EACH KIND OF MALICIOUS DRIVER CAN TAKE
+    riderPool = board.numDrivers*inRange*numpy.array([driverProbMale*kind["allowMale"] + (1 - driverProbMale)*kind["allowFemale"] for kind in riders])
+    driverPool = inRange*numpy.array([riderCounts[[kind["allowMale" if male else "allowFemale"] for kind in riders]].sum() for male, targetWomen, share in malicious])
+    riderRemoved = numpy.zeros(len(riders))       #TARGETS EACH KIND OF RIDER HAS ASSAULTED, ON AVERAGE
+    driverRemoved = numpy.zeros(len(malicious))   #TARGETS EACH KIND OF MALICIOUS DRIVER HAS ASSAULTED, ON AVERAGE
+
+    #RIDER ACCOUNTABILITY: SHARE OF EACH KIND OF RIDER BY DAYS SINCE THEIR LAST ASSAULT, WITH 0 FOR
+    #RIDERS WHOSE LAST ASSAULT (IF ANY) IS OVER daysUntilRemoved + daysUntilReturn DAYS AGO
+    if (isinstance(policy, RiderAccountability)):
+        window = max(policy.daysUntilRemoved + policy.daysUntilReturn, 2)
+        canRide = numpy.arange(window) < max(policy.daysUntilRemoved, 1)
+    else:
+        window = 1
+        canRide = numpy.ones(1, dtype=bool)
+    timers = numpy.zeros((len(riders), window))
+    timers[:, 0] = 1
+
+    #DRIVER ACCOUNTABILITY: EXPECTED MALICIOUS DRIVERS OF EACH KIND YET TO ASSAULT, AND OF THOSE
+    #WHO HAVE, BY DAYS SINCE THEIR FIRST ASSAULT
+    waiting = board.numDrivers*numpy.array([share for male, targetWomen, share in malicious])
+    reroll = policy.daysUntilReroll if isinstance(policy, DriverAccountability) else 0
+    started = numpy.zeros((len(malicious), reroll))
+    redrawn = numpy.array([share for male, isMalicious, targetWomen, share in driverKinds(board, board.driverProbMale) if isMalicious])
+
+    totalRides = 0.0
+    totalAssaults = 0.0
+    for day in range(board.numDays):
+        active = (timers*canRide).sum(axis=1)
+        rides = riderCounts*active*rideProbability
+        probMale, driverRides = assignDrivers(board, riders, rides, driverProbMale, policy)
+        targeted = numpy.where(riderTargetWomen, 1 - probMale, probMale)
+        riderRate = probAssault*riderMalicious*targetsLeft(targeted, riderPool, riderRemoved)
+        driverRate = numpy.zeros(len(malicious))
+        for k, (male, targetWomen, share) in enumerate(malicious):
+            served = rides*(probMale if male else 1 - probMale)
+            if (served.sum() > 0):
+                targets = served[numpy.array([kind["male"] != targetWomen for kind in riders])].sum()
+                driverRate[k] = probAssault*driverRides[male]*targetsLeft(targets/served.sum(), driverPool[k], driverRemoved[k])
+        totalRides += rides.sum()
+        totalAssaults += (rides*riderRate).sum() + ((waiting + started.sum(axis=1))*driverRate).sum()
+        riderRemoved += active*rideProbability*riderRate
+        if (not isinstance(policy, DriverAccountability)):
+            driverRemoved += driverRate
+
+        if (isinstance(policy, RiderAccountability)):
+            #A RIDER WHO ASSAULTS GOES TO DAY 1 OF THEIR TIMER; EVERYONE ELSE'S TIMER MOVES ON A DAY
+            assaulting = timers*canRide*(rideProbability*riderRate)[:, None]
+            staying = timers - assaulting
+            timers = numpy.zeros_like(timers)
+            timers[:, 0] = staying[:, 0] + staying[:, -1]
+            timers[:, 2:] = staying[:, 1:-1]
+            timers[:, 1] += assaulting.sum(axis=1)
+        if (isinstance(policy, DriverAccountability)):
+            #A DRIVER'S FIRST ASSAULT STARTS THEIR TIMER; daysUntilReroll DAYS LATER THEY ARE REDRAWN
+            first = waiting*(1 - numpy.exp(-driverRate))
+            started = numpy.concatenate([first[:, None], started], axis=1)
+            waiting = waiting - first + started[:, reroll:].sum()*redrawn
+            started = started[:, :reroll]
+    return float(totalRides), float(totalAssaults)
+
+
+#Prints a mean-field estimate in the layout the models print their runs' means in.
+def printEstimate(name, rides, assaults):
+    print(name.upper() + " MEAN-FIELD ESTIMATE")
+    print("average rides per sim: " + str(rides))
+    print("mean assaults: " + str(assaults))
+    print()
+
+
+#Estimates every run in MAIN_RUNS and prints each estimate next to the run's means, with the
+#relative error and how many of the run's standard errors it is off by. Runs in NOT_COMPARABLE
+#are printed with the reason instead of errors.
+#Returns a list of (name, estimated rides, run's rides, estimated assaults, run's assaults) of the
+#comparable runs.
+def printMainRunErrors():
+    rows = []
+    print("%-26s %10s %10s %7s %6s %8s %9s %7s %6s" % ("run", "rides", "simulated", "error", "z", "assaults", "simulated", "error", "z"))
+    for name, policy, meanRides, ridesError, meanAssaults, assaultsError in MAIN_RUNS:
+        rides, assaults = estimate(policy)
+        if (name in NOT_COMPARABLE):
+            print("%-26s %10.1f %10.1f %14s %8.1f %9.1f   not comparable: %s" % (name, rides, meanRides, "", assaults, meanAssaults, NOT_COMPARABLE[name]))
+            continue
+        rows.append((name, rides, meanRides, assaults, meanAssaults))
+        print("%-26s %10.1f %10.1f %+6.2f%% %+6.1f %8.1f %9.1f %+6.1f%% %+6.1f" % (name, rides, meanRides, 100*(rides/meanRides - 1), (rides - meanRides)/ridesError,
+                                                                               assaults, meanAssaults, 100*(assaults/meanAssaults - 1), (assaults - meanAssaults)/assaultsError))
+    return rows
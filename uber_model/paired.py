@@ -0,0 +1,137 @@
+import os
+
+import numpy
+import scipy
+from scipy import stats
+
+from .board import Board
+from .policies import Policy
+from .runner import mapReplications, spawnSeeds
+from .shared import SharedPopulation
+
+# Paired (common random numbers) runs of several policies.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# Uber_Model_baseline.py and Uber_Model_choice_test.py build independent boards from different seeds
+# and each compares its mean to a constant. Most of the spread in assault totals comes from where
+# people are and who is malicious, not from the policy. Here each replication builds its population
+# once and runs every policy on it, with the same seed for the daily draws, so the policies see the
+# same agents (apart from any a policy changes), the same riders needing rides each day and the same
+# pickup orders. The difference
+# between two policies is then measured within each replication and tested with a paired t-test,
+# which needs far fewer replications to detect the same effect.
+
+# By default each replication runs all of its policies in lockstep in one worker. With
+# shareMemory=True the parent builds each replication's population once, puts it in shared memory
+# (see shared.py) and hands every (replication, policy) pair to the workers separately, so the
+# policies of one replication run side by side and each worker only allocates its board's own state.
+# Both give the same results for the same seed.
+
+
+#Runs one replication of every policy on a single population with the same random streams.
+#The boards are run in lockstep, one day at a time: the first board makes the day's draws
+#and every other board, whose day stream is the same, is handed those draws and moved on
+#to the same stream state instead of drawing them again.
+#Returns a list of (total rides, total assaults), one per policy.
+def runPairedReplication(policies, seedSequence, boardType, overrides):
+    boards = []
+    population = None
+    for policy in policies:
+        boards.append(boardType(seedSequence, policy, population, **overrides))
+        population = boards[0].basePopulation
+    first = boards[0]
+    while (first.day < first.numDays):
+        draws = first.drawDay()
+        for board in boards:
+            if (board is not first):
+                board.rng.bit_generator.state = first.rng.bit_generator.state
+            board.runDay(draws)
+    return [(sum(board.rides), sum(board.assaults)) for board in boards]
+
+
+#Runs one policy on a population held in shared memory.
+#Returns (total rides, total assaults).
+def runSharedPolicy(sharedPopulation, policy, seedSequence, boardType, overrides):
+    board = boardType(seedSequence, policy, sharedPopulation.population(), **overrides)
+    board.runSim()
+    return sum(board.rides), sum(board.assaults)
+
+
+#Runs the replications with the given seeds, sharing each one's population with the workers.
+#Populations are built and shared `workers` replications at a time and freed once their
+#policies have run. Yields each replication's list of (total rides, total assaults).
+def runSharedReplications(policies, seedSequences, workers, boardType, overrides):
+    batchSize = max(1, workers if workers is not None else os.cpu_count())
+    for start in range(0, len(seedSequences), batchSize):
+        batch = seedSequences[start:start + batchSize]
+        sharedPopulations = [SharedPopulation(boardType(seedSequence, None, **overrides).basePopulation) for seedSequence in batch]
+        try:
+            argLists = [(sharedPopulation, policy, seedSequence, boardType, overrides)
+                        for sharedPopulation, seedSequence in zip(sharedPopulations, batch) for policy in policies]
+            results = list(mapReplications(runSharedPolicy, argLists, workers))
+        finally:
+            for sharedPopulation in sharedPopulations:
+                sharedPopulation.unlink()
+        for i in range(len(batch)):
+            yield results[i*len(policies):(i + 1)*len(policies)]
+
+
+#Runs numSims paired replications of the given policies (the baseline first, by convention)
+#on up to `workers` processes. Extra keyword arguments are Board parameter overrides.
+#shareMemory runs each policy as its own task on a population in shared memory.
+#Returns a list with one (total_rides, total_assaults) pair of lists per policy.
+def runPaired(policies, numSims=50, workers=None, seed=None, boardType=Board, verbose=True, shareMemory=False, **overrides):
+    results = [([], []) for policy in policies]
+    seedSequences = spawnSeeds(seed, numSims)
+    if (shareMemory):
+        replications = runSharedReplications(policies, seedSequences, workers, boardType, overrides)
+    else:
+        argLists = [(policies, seedSequence, boardType, overrides) for seedSequence in seedSequences]
+        replications = mapReplications(runPairedReplication, argLists, workers)
+    for i, totals in enumerate(replications):
+        if (verbose):
+            print("Simulation " + str(i + 1) + " complete! ")
+        for (total_rides, total_assaults), (rides, assaults) in zip(results, totals):
+            total_rides.append(rides)
+            total_assaults.append(assaults)
+    return results
+
+
+#Paired t-test of treatment against baseline, two lists of per-replication totals
+#from the same replications.
+#Returns a dictionary with the mean difference, its p-value, the correlation between
+#the pairs and varianceRatio, the fraction of the replications an unpaired comparison
+#would need for the same precision.
+def pairedTest(baseline, treatment):
+    baseline = numpy.asarray(baseline, dtype=float)
+    treatment = numpy.asarray(treatment, dtype=float)
+    difference = treatment - baseline
+    s, p = scipy.stats.ttest_rel(treatment, baseline, alternative="two-sided")
+    unpairedVariance = numpy.var(baseline, ddof=1) + numpy.var(treatment, ddof=1)
+    return {
+        "meanDifference": float(numpy.mean(difference)),
+        "stdDifference": float(numpy.std(difference, ddof=1)),
+        "pValue": float(p),
+        "correlation": float(numpy.corrcoef(baseline, treatment)[0, 1]),
+        "varianceRatio": float(numpy.var(difference, ddof=1) / unpairedVariance) if unpairedVariance > 0 else float("nan"),
+    }
+
+
+#Prints a paired test in the same layout as the significance tests in the models.
+def printPairedTest(label, baselineName, treatmentName, baseline, treatment, alpha=0.05):
+    test = pairedTest(baseline, treatment)
+    print(label + " paired test: ")
+    print("Ho: mu(" + treatmentName + " - " + baselineName + ") = 0")
+    print("Ha: mu(" + treatmentName + " - " + baselineName + ") != 0")
+    print("Significance level = " + str(alpha))
+    print("mean " + baselineName + ": " + str(numpy.mean(baseline)))
+    print("mean " + treatmentName + ": " + str(numpy.mean(treatment)))
+    print("mean difference: " + str(test["meanDifference"]))
+    print("P_value = " + str(test["pValue"]))
+    print("Reject Ho = " + str((test["pValue"] < alpha)))
+    print("Correlation between pairs = " + str(test["correlation"]))
+    print("Replications needed relative to unpaired runs = " + str(test["varianceRatio"]))
+    print()
+    return test
@@ -0,0 +1,245 @@
+import numpy
+
+from .population import NO_PREFERENCE, PREFERS_MALE, drawAttributes
+
+# Policies that can be plugged into uber_model.Board.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# Each policy is the part of a model that differs from the baseline. A Board calls its policy's hooks
+# at fixed points in the simulation, and the baseline Policy leaves everything as it is, so one engine
+# can run the baseline and a policy on exactly the same agents.
+
+# Between them, the hooks cover every model in Further Tests: adjustPopulation changes how agents are
+# generated (driver vetting, more women drivers, opt-out segregation), allowedEdges which pairs can be
+# matched (sex segregation, opt-out segregation), assaultProbability the chance of an assault on a ride
+# (safety measures), and setup, assaulted, activeMask and endDay keep the accountability timers (rider and
+# driver accountability). Policies that draw random numbers use board.policyRng, so they never shift
+# the day or assault streams other policies on the same seed see.
+
+
+#The driver ID of every edge, in edge order.
+def edgeDriverIds(geometry):
+    return numpy.repeat(numpy.arange(geometry.numDrivers, dtype=numpy.int32), numpy.diff(geometry.driverIndptr))
+
+
+#The baseline model: no changes.
+class Policy:
+    name = "baseline"
+    changesDrivers = False      #WHETHER THE POLICY CHANGES OR REDRAWS DRIVERS (IN adjustPopulation OR endDay)
+    driverAssaultsMaliciousRiders = True    #WHETHER A MALICIOUS DRIVER CAN ASSAULT A MALICIOUS RIDER WHO DID NOT ASSAULT THEM
+
+    #Returns the driver's pickup order for the day. queue is the list of active
+    #rider IDs in range, already in a random order.
+    def orderQueue(self, board, driver, queue):
+        return queue
+
+    #The same ordering for the batched engine. drivers and riders are parallel arrays of
+    #every (driver, rider) queue entry for the day. Returns an array ranking each entry
+    #within its driver's queue (lower ranks are picked up first, ties in random order),
+    #or None to leave the queues in random order.
+    def queueRank(self, board, drivers, riders):
+        return None
+
+    #Returns the population the board runs on, given the one built from the board's seed.
+    #That population may be shared with other boards, so a policy that changes agents
+    #returns population.withArrays(...) with its own copies of the arrays it changes.
+    def adjustPopulation(self, board, population):
+        return population
+
+    #Returns a boolean array over the board's edges of the (driver, rider) pairs that can
+    #ever be matched, or None to allow every pair in range.
+    def allowedEdges(self, board):
+        return None
+
+    #Called once when the board is built, to add any arrays the policy keeps to
+    #board.policyState.
+    def setup(self, board):
+        pass
+
+    #Returns a boolean array of the riders allowed to need a ride today, or None to allow
+    #everyone. It is combined with the day's draws, so the draws are the same either way.
+    def activeMask(self, board):
+        return None
+
+    #Probability of an assault on rides where a malicious person is with a target: a number,
+    #or an array matching drivers and riders (arrays of IDs, or single IDs).
+    def assaultProbability(self, board, drivers, riders):
+        return board.probAssault
+
+    #Called after assaults happen, with parallel arrays of the drivers and riders
+    #involved and whether the rider was the one who committed it.
+    def assaulted(self, board, drivers, riders, byRider):
+        pass
+
+    #Called at the end of every day, before board.day moves on to the next one.
+    def endDay(self, board):
+        pass
+
+
+#Riders may indicate a preferred driver sex (Uber_Model_choice_test.py). A driver picks up riders
+#who are fine with the driver's sex first, and only picks up the others once nobody compatible is left.
+#Uber_Model_choice_test.py also changed the assault rule: it never checks the driver for an assault
+#when the rider is malicious, where the baseline checks the driver whenever the rider did not assault.
+#By default this policy keeps the baseline's rule, so that it only differs from the baseline in rider
+#choice; RiderChoice(driverAssaultsMaliciousRiders=False) uses the choice test's rule, which is the
+#one behind the choice run in the_main_runs.txt.
+class RiderChoice(Policy):
+    name = "choice"
+
+    def __init__(self, driverAssaultsMaliciousRiders=True):
+        self.driverAssaultsMaliciousRiders = driverAssaultsMaliciousRiders
+
+    def orderQueue(self, board, driver, queue):
+        preference = board.population.riderPreference
+        driverMale = board.population.driverMale[driver]
+        compatible = []
+        incompatible = []
+        for rider in queue:
+            if (preference[rider] == NO_PREFERENCE or (preference[rider] == PREFERS_MALE) == driverMale):
+                compatible.append(rider)
+            else:
+                incompatible.append(rider)
+        return compatible + incompatible
+
+    def queueRank(self, board, drivers, riders):
+        preference = board.population.riderPreference[riders]
+        compatible = (preference == NO_PREFERENCE) | ((preference == PREFERS_MALE) == board.population.driverMale[drivers])
+        return (~compatible).astype(numpy.int8)
+
+
+#A rider who commits an assault is removed from the app daysUntilRemoved days later, and comes back
+#on a new account daysUntilReturn days after that (Further Tests/Uber_Model_rider_accountability.py).
+#The day of each rider's last assault is kept in an array, and the removal window is a mask over it.
+class RiderAccountability(Policy):
+    name = "rider accountability"
+
+    def __init__(self, daysUntilRemoved=3, daysUntilReturn=3):
+        self.daysUntilRemoved = daysUntilRemoved    #NUMBER OF DAYS AFTER A RIDER COMMITS AN ASSAULT THAT THEY ARE REMOVED FROM ACTIVITY
+        self.daysUntilReturn = daysUntilReturn      #NUMBER OF DAYS AFTER A RIDER IS REMOVED THAT THEY RETURN TO THE SERVICE
+
+    def setup(self, board):
+        board.policyState["riderLastAssault"] = numpy.full(board.numRiders, -(board.numDays + 1), dtype=numpy.int32)
+
+    def activeMask(self, board):
+        daysSince = board.day - board.policyState["riderLastAssault"]
+        return (daysSince < self.daysUntilRemoved) | (daysSince >= self.daysUntilRemoved + self.daysUntilReturn)
+
+    def assaulted(self, board, drivers, riders, byRider):
+        board.policyState["riderLastAssault"][riders[byRider]] = board.day
+
+
+#Safety measures in the car, such as barriers or cameras, lower the probability of an assault on a
+#ride with a malicious person (Further Tests/Uber_Model_safety_test.py).
+class SafetyMeasures(Policy):
+    name = "safety"
+
+    def __init__(self, probAssault=0.4):
+        self.probAssault = probAssault      #PROBABILITY OF AN ASSAULT DURING A RIDE WITH A MALICIOUS PERSON
+
+    def assaultProbability(self, board, drivers, riders):
+        return self.probAssault
+
+
+#Background checks catch a share of the malicious drivers (Further Tests/Uber_Model_driver_vetting.py).
+#Each malicious driver is caught with probability vettingEfficacy and replaced by a non-malicious
+#driver of the same sex, which leaves drivers malicious with probability
+#probMaliciousGivenMan * (1 - vettingEfficacy) (or GivenWoman), while keeping every driver the vetting
+#does not catch the same as on the baseline board. This fixes a bug in Uber_Model_driver_vetting.py,
+#which applies vettingEfficacy in its Rider class and so vets the riders, not the drivers. The driver
+#vetting run in the_main_runs.txt comes from that script, so it is a run of rider vetting and is not
+#comparable with this policy.
+class DriverVetting(Policy):
+    name = "driver vetting"
+    changesDrivers = True
+
+    def __init__(self, vettingEfficacy=0.5):
+        self.vettingEfficacy = vettingEfficacy      #PROBABILITY THAT A MALICIOUS DRIVER IS CAUGHT BY VETTING
+
+    def adjustPopulation(self, board, population):
+        caught = population.driverMalicious & (board.policyRng.random(population.numDrivers) < self.vettingEfficacy)
+        return population.withArrays(driverMalicious=population.driverMalicious & ~caught,
+                                     driverTargetWomen=population.driverTargetWomen & ~caught)
+
+
+#A different share of the drivers are men (Further Tests/Uber_Model_more_women_drivers.py, run with
+#0.5 and 0.0). Every driver's sex is drawn again, along with whether they are malicious and whom they
+#target, since both depend on their sex.
+class MoreWomenDrivers(Policy):
+    name = "more women drivers"
+    changesDrivers = True
+
+    def __init__(self, driverProbMale=0.5):
+        self.driverProbMale = driverProbMale        #PROBABILITY A DRIVER IS MALE
+
+    def adjustPopulation(self, board, population):
+        male, isMalicious, targetWomen = drawAttributes(board.policyRng, population.numDrivers, self.driverProbMale, board)
+        return population.withArrays(driverMale=male, driverMalicious=isMalicious, driverTargetWomen=targetWomen)
+
+
+#Drivers only pick up riders of their own sex (Further Tests/Uber_Model_sex_segregation.py).
+class SexSegregation(Policy):
+    name = "sex segregation"
+
+    def allowedEdges(self, board):
+        geometry = board.geometry
+        return board.population.riderMale[geometry.riderIndices] == board.population.driverMale[edgeDriverIds(geometry)]
+
+
+#Riders are only picked up by drivers of their own sex unless they opt out
+#(Further Tests/Uber_Model_opt-out_segregation.py). Non-malicious men stay segregated with
+#probability probSegregatedGivenMale and non-malicious women with probSegregatedGivenFemale;
+#malicious riders opt out exactly when they target the other sex. Whether each rider is segregated
+#is kept in the population as riderSegregated.
+class OptOutSegregation(Policy):
+    name = "opt-out segregation"
+
+    def __init__(self, probSegregatedGivenMale=0.3, probSegregatedGivenFemale=0.7):
+        self.probSegregatedGivenMale = probSegregatedGivenMale        #PROBABILITY THAT A MALE RIDER WILL STAY SEGREGATED
+        self.probSegregatedGivenFemale = probSegregatedGivenFemale    #PROBABILITY THAT A FEMALE RIDER WILL STAY SEGREGATED
+
+    def adjustPopulation(self, board, population):
+        male = population.riderMale
+        stays = board.policyRng.random(population.numRiders) < numpy.where(male, self.probSegregatedGivenMale, self.probSegregatedGivenFemale)
+        segregated = numpy.where(population.riderMalicious, population.riderTargetWomen != male, stays)
+        return population.withArrays(riderSegregated=segregated)
+
+    def allowedEdges(self, board):
+        geometry = board.geometry
+        sameSex = board.population.riderMale[geometry.riderIndices] == board.population.driverMale[edgeDriverIds(geometry)]
+        return sameSex | ~board.population.riderSegregated[geometry.riderIndices]
+
+
+#A driver who commits an assault is removed daysUntilReroll days after their first assault and
+#replaced by a new driver in the same place, with newly drawn sex, malice and target
+#(Further Tests/Uber_Model_driver_accountability.py, run with 1, 3 and 10). The day of each
+#driver's first assault since they were last replaced is kept in an array, and the drivers due
+#for replacement are redrawn at the end of each day. The board gets its own copies of the driver
+#arrays to change.
+class DriverAccountability(Policy):
+    name = "driver accountability"
+    changesDrivers = True
+
+    def __init__(self, daysUntilReroll=10):
+        self.daysUntilReroll = daysUntilReroll      #THE NUMBER OF DAYS AFTER A DRIVER COMMITS AN ASSAULT UNTIL REROLL
+
+    def adjustPopulation(self, board, population):
+        return population.withArrays(driverMale=population.driverMale.copy(), driverMalicious=population.driverMalicious.copy(),
+                                     driverTargetWomen=population.driverTargetWomen.copy())
+
+    def setup(self, board):
+        board.policyState["driverFirstAssault"] = numpy.full(board.numDrivers, -(board.numDays + 1), dtype=numpy.int32)
+
+    def assaulted(self, board, drivers, riders, byRider):
+        firstAssault = board.policyState["driverFirstAssault"]
+        drivers = drivers[~byRider]
+        firstAssault[drivers[firstAssault[drivers] < 0]] = board.day
+
+    def endDay(self, board):
+        firstAssault = board.policyState["driverFirstAssault"]
+        due = numpy.flatnonzero((firstAssault >= 0) & (board.day + 1 - firstAssault >= self.daysUntilReroll))
+        if (len(due) > 0):
+            population = board.population
+            population.driverMale[due], population.driverMalicious[due], population.driverTargetWomen[due] = drawAttributes(board.policyRng, len(due), board.driverProbMale, board)
+            firstAssault[due] = -(board.numDays + 1)
@@ -0,0 +1,224 @@
+import numpy
+
+# Struct-of-arrays storage for the drivers and riders on a board.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# The original models keep every driver and rider as its own Python object. Here each attribute is one
+# typed NumPy array indexed by an integer agent ID (drivers 0..numDrivers-1, riders 0..numRiders-1),
+# so generating a population is a handful of vectorized draws and each agent costs a few bytes.
+# DriverView and RiderView give the old object API (driver.male, rider.needRide, ...) on top of it.
+
+NO_PREFERENCE = 0       #RIDER HAS NO PREFERRED DRIVER SEX
+PREFERS_MALE = 1        #RIDER PREFERS MALE DRIVERS
+PREFERS_FEMALE = 2      #RIDER PREFERS FEMALE DRIVERS
+
+
+#Draws the sex and malicious attributes of n agents, following the same conditional
+#probabilities as Driver.__init__ and Rider.__init__ in the models.
+#Returns (male, isMalicious, targetWomen) boolean arrays. targetWomen is False for
+#non-malicious agents.
+def drawAttributes(rng, n, probMale, board):
+    male = rng.random(n) < probMale
+    isMalicious = rng.random(n) < numpy.where(male, board.probMaliciousGivenMan, board.probMaliciousGivenWoman)
+    targetWomen = (rng.random(n) < numpy.where(male, board.mTw, board.wTw)) & isMalicious
+    return male, isMalicious, targetWomen
+
+
+#Draws the preferred driver sex of n riders, following Rider.__init__ in Uber_Model_choice_test.py:
+#predatory malicious riders ask for the sex they target, opportunistic ones ask for nothing, and
+#non-malicious riders ask for a sex with the probabilities on the board.
+#Returns an int8 array of NO_PREFERENCE, PREFERS_MALE or PREFERS_FEMALE.
+def drawPreferences(rng, male, isMalicious, targetWomen, board):
+    n = len(male)
+    first = rng.random(n)
+    second = rng.random(n)
+    predatory = isMalicious & (first >= board.probOpportunist)
+    hasPreference = ~isMalicious & (first < numpy.where(male, board.mPreference, board.wPreference))
+    prefersWomen = second < numpy.where(male, board.mPw, board.wPw)
+    preference = numpy.full(n, NO_PREFERENCE, dtype=numpy.int8)
+    preference[(predatory & targetWomen) | (hasPreference & prefersWomen)] = PREFERS_FEMALE
+    preference[(predatory & ~targetWomen) | (hasPreference & ~prefersWomen)] = PREFERS_MALE
+    return preference
+
+
+class Population:
+
+    #geometry is the geometry.Geometry the agents are placed on.
+    def __init__(self, board, rng, geometry):
+        self.numDrivers = geometry.numDrivers    #NUMBER OF DRIVERS
+        self.numRiders = geometry.numRiders      #NUMBER OF RIDERS
+        self.geometry = geometry                 #COORDINATES AND RIDERS IN RANGE OF EACH DRIVER
+
+        self.driverCoords = geometry.driverCoords   #COORDINATES OF EACH DRIVER
+        self.riderCoords = geometry.riderCoords     #COORDINATES OF EACH RIDER
+
+        self.driverMale, self.driverMalicious, self.driverTargetWomen = drawAttributes(rng, self.numDrivers, board.driverProbMale, board)
+        self.riderMale, self.riderMalicious, self.riderTargetWomen = drawAttributes(rng, self.numRiders, board.riderProbMale, board)
+        self.riderPreference = drawPreferences(rng, self.riderMale, self.riderMalicious, self.riderTargetWomen, board)   #PREFERRED DRIVER SEX OF EACH RIDER
+
+    #The agents' attribute arrays by name (the coordinates belong to the geometry).
+    def arrays(self):
+        return {name: value for name, value in vars(self).items() if isinstance(value, numpy.ndarray) and name not in ("driverCoords", "riderCoords")}
+
+    #Rebuilds a population from a geometry and the arrays returned by arrays().
+    @classmethod
+    def fromArrays(cls, geometry, arrays):
+        population = cls.__new__(cls)
+        population.numDrivers = geometry.numDrivers
+        population.numRiders = geometry.numRiders
+        population.geometry = geometry
+        population.driverCoords = geometry.driverCoords
+        population.riderCoords = geometry.riderCoords
+        for name, value in arrays.items():
+            setattr(population, name, value)
+        return population
+
+    #A population with some of the attribute arrays replaced, sharing the geometry and the
+    #other arrays with this one. Policies use it to change agents without touching a
+    #population other boards are running on.
+    def withArrays(self, **arrays):
+        return Population.fromArrays(self.geometry, dict(self.arrays(), **arrays))
+
+    #Total number of bytes held by the population arrays.
+    @property
+    def nbytes(self):
+        return sum(value.nbytes for value in vars(self).values() if isinstance(value, numpy.ndarray))
+
+
+#Read-only sequence of agent views, standing in for the setDrivers/setRiders sets
+#of the object models.
+class AgentList:
+
+    def __init__(self, board, viewType, size):
+        self.board = board
+        self.viewType = viewType
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if (i < 0 or i >= self.size):
+            raise IndexError(i)
+        return self.viewType(self.board, i)
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self.viewType(self.board, i)
+
+    def __contains__(self, agent):
+        return isinstance(agent, self.viewType) and agent.board is self.board and 0 <= agent.id < self.size
+
+
+#Shared behaviour of DriverView and RiderView. Two views are equal when they
+#point at the same agent on the same board, so they can be used in sets.
+class AgentView:
+    __slots__ = ("board", "id")
+
+    def __init__(self, board, id):
+        self.board = board
+        self.id = id
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.board is other.board and self.id == other.id
+
+    def __hash__(self):
+        return hash((type(self), self.id))
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + str(self.id) + ")"
+
+
+class DriverView(AgentView):
+    __slots__ = ()
+
+    @property
+    def male(self):
+        return bool(self.board.population.driverMale[self.id])
+
+    @male.setter
+    def male(self, value):
+        self.board.population.driverMale[self.id] = value
+
+    @property
+    def isMalicious(self):
+        return bool(self.board.population.driverMalicious[self.id])
+
+    @isMalicious.setter
+    def isMalicious(self, value):
+        self.board.population.driverMalicious[self.id] = value
+
+    #None if the driver is not malicious, like the object models.
+    @property
+    def targetWomen(self):
+        if (not self.isMalicious):
+            return None
+        return bool(self.board.population.driverTargetWomen[self.id])
+
+    @targetWomen.setter
+    def targetWomen(self, value):
+        self.board.population.driverTargetWomen[self.id] = bool(value)
+
+    @property
+    def coords(self):
+        x, y = self.board.population.driverCoords[self.id]
+        return (float(x), float(y))
+
+    @property
+    def ridersInRange(self):
+        return {RiderView(self.board, i) for i in self.board.ridersOf(self.id).tolist()}
+
+
+class RiderView(AgentView):
+    __slots__ = ()
+
+    @property
+    def male(self):
+        return bool(self.board.population.riderMale[self.id])
+
+    @male.setter
+    def male(self, value):
+        self.board.population.riderMale[self.id] = value
+
+    @property
+    def isMalicious(self):
+        return bool(self.board.population.riderMalicious[self.id])
+
+    @isMalicious.setter
+    def isMalicious(self, value):
+        self.board.population.riderMalicious[self.id] = value
+
+    #None if the rider is not malicious, like the object models.
+    @property
+    def targetWomen(self):
+        if (not self.isMalicious):
+            return None
+        return bool(self.board.population.riderTargetWomen[self.id])
+
+    @targetWomen.setter
+    def targetWomen(self, value):
+        self.board.population.riderTargetWomen[self.id] = bool(value)
+
+    @property
+    def needRide(self):
+        return bool(self.board.needRide[self.id])
+
+    @needRide.setter
+    def needRide(self, value):
+        self.board.needRide[self.id] = value
+
+    #"M", "F" or None, like the choice test model.
+    @property
+    def preferredSex(self):
+        return {NO_PREFERENCE: None, PREFERS_MALE: "M", PREFERS_FEMALE: "F"}[int(self.board.population.riderPreference[self.id])]
+
+    @property
+    def coords(self):
+        x, y = self.board.population.riderCoords[self.id]
+        return (float(x), float(y))
+
+    @property
+    def driversInRange(self):
+        return [DriverView(self.board, i) for i in self.board.driversOf(self.id).tolist()]
@@ -0,0 +1,85 @@
+import json
+import os
+import time
+
+# Opt-in timers and counters for uber_model.Board.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# A board only profiles itself when it has a Profiler, e.g. Board(2112, profiler=Profiler()); without
+# one, the only cost is a check of board.profiler a few times a day. With one, the board records the
+# wall-clock time of each phase of building the board and of each day:
+#   population  - placing everyone, finding who is in range and drawing their attributes (or nothing,
+#                 when the board is given a population)
+#   coverage    - setting up the (driver, rider) pairs still in range, with the policy's allowedEdges
+#   policySetup - the policy's setup
+#   activation  - drawing who needs a ride and stamping them as waiting
+#   queues      - gathering the day's (driver, rider) pairs and building every driver's queue
+#   matching    - the rounds of rides and assault draws
+#   endDay      - the policy's end-of-day work (accountability timers)
+# and, for each day, these counters:
+#   rounds           - rounds run before everyone was served or no driver had anyone left
+#   activeRiders     - riders who needed a ride
+#   queueEntries     - (driver, rider) entries across all the drivers' queues
+#   rides, assaults  - as in board.rides and board.assaults
+#   staleSkips       - queue entries skipped because another driver had already served the rider
+#   driversExhausted - drivers whose queue ran out before the day ended
+#   ridersUnserved   - riders who still needed a ride at the end of the day
+# The hybrid engine has no rounds or queues: its queueEntries are the (driver, rider) pairs it picks
+# drivers from, it leaves out rounds and driversExhausted, and all of its day after activation is matching.
+# runner.runReplications(..., profileDirectory=folder) gives every replication a profiler and saves
+# each one as JSON.
+
+
+class Profiler:
+
+    def __init__(self):
+        self.setup = {}         #TIME OF EACH PHASE OF BUILDING THE BOARD, IN SECONDS
+        self.days = []          #TIMES AND COUNTERS OF EACH DAY
+        self.lapStart = None    #WHEN THE CURRENT PHASE STARTED
+        self.times = None       #TIMES OF THE CURRENT DAY'S PHASES SO FAR
+        self.counts = None      #COUNTERS OF THE CURRENT DAY SO FAR
+
+    #Starts timing a board's construction or a day.
+    def start(self):
+        self.times = {}
+        self.lapStart = time.perf_counter()
+
+    #Ends the current phase, adding its time to the phase called name.
+    def lap(self, name):
+        now = time.perf_counter()
+        self.times[name] = self.times.get(name, 0.0) + now - self.lapStart
+        self.lapStart = now
+
+    #Ends the board's construction.
+    def endSetup(self):
+        self.setup.update(self.times)
+
+    #Ends a day, recording its times and the counters in counts.
+    def endDay(self, board, counts):
+        counts["rides"] = board.rides[board.day]
+        counts["assaults"] = board.assaults[board.day]
+        counts["staleSkips"] = board.staleSkips[board.day]
+        self.days.append({"day": board.day, "times": self.times, "counts": {name: int(value) for name, value in counts.items()}})
+
+    #Sums of every day's times and counters.
+    def totals(self):
+        times = {}
+        counts = {}
+        for day in self.days:
+            for name, value in day["times"].items():
+                times[name] = times.get(name, 0.0) + value
+            for name, value in day["counts"].items():
+                counts[name] = counts.get(name, 0) + value
+        return {"times": times, "counts": counts}
+
+    def toDict(self):
+        return {"setup": self.setup, "totals": self.totals(), "days": self.days}
+
+    #Writes the profile to a JSON file, under a temporary name first.
+    def save(self, path):
+        temporary = path + "." + str(os.getpid()) + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.toDict(), file, indent=1)
+        os.replace(temporary, path)
@@ -0,0 +1,93 @@
+import os
+import random as r
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from .profiler import Profiler
+
+# Replication runner for the MAIN CODE loop of the models.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# Every model runs 50 independent simulations and only keeps each one's total rides and assaults,
+# so the replications can be handed to a pool of worker processes and the totals collected in order.
+
+# Each replication gets its own random stream. The root seed set in MAIN CODE is turned into a
+# numpy.random.SeedSequence and spawned into one child per replication; replication i always gets
+# child i, whichever process runs it. The child seeds the random module (which the models draw from)
+# before the Board is built, and uber_model.Board seeds its own Generator from the random module, so
+# the results are identical whether the replications run serially, on 4 workers or on 64.
+
+# runReplications(..., profileDirectory=folder) profiles every replication (see profiler.py) and saves
+# replication i's profile as profile_i.json in the folder. Only uber_model boards can be profiled.
+
+
+#Turns a SeedSequence into a 128-bit integer seed for the random module.
+def replicationSeed(seedSequence):
+    return int.from_bytes(seedSequence.generate_state(4).tobytes(), "little")
+
+
+#Spawns one independent SeedSequence per replication from a root seed.
+#A root seed of None draws fresh entropy from the operating system.
+def spawnSeeds(seed, numSims):
+    return numpy.random.SeedSequence(seed).spawn(numSims)
+
+
+#Builds and runs one board on its own random stream. If profilePath is given the board
+#is profiled, with the time makeBoard() took as the "build" setup phase, and the profile is
+#saved there.
+#Returns (total rides, total assaults, total stale queue entries skipped).
+def runReplication(makeBoard, seedSequence, profilePath=None):
+    r.seed(replicationSeed(seedSequence))
+    start = time.perf_counter()
+    board = makeBoard()
+    if (profilePath is not None):
+        if (not hasattr(board, "profiler")):
+            raise TypeError(type(board).__name__ + " cannot be profiled; only uber_model boards can")
+        board.profiler = Profiler()
+        board.profiler.setup["build"] = time.perf_counter() - start
+    board.runSim()
+    if (profilePath is not None):
+        board.profiler.save(profilePath)
+    return sum(board.rides), sum(board.assaults), sum(getattr(board, "staleSkips", []))
+
+
+#Calls function(*args) for every tuple in argLists on up to `workers` processes (all cores
+#if None, in this process if 1) and yields the results in the order of argLists.
+#function has to be picklable, so it must be defined at the top level of its module.
+def mapReplications(function, argLists, workers=None):
+    argLists = list(argLists)
+    if (workers is None):
+        workers = os.cpu_count()
+    if (workers <= 1 or len(argLists) <= 1):
+        for args in argLists:
+            yield function(*args)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(argLists))) as executor:
+        for result in executor.map(function, *zip(*argLists)):
+            yield result
+
+
+#Runs numSims replications of makeBoard() on up to `workers` processes (all cores if None,
+#in this process if 1). makeBoard is usually the Board class of a model; it has to be picklable,
+#so it must be defined at the top level of its module.
+#profileDirectory, if given, is a folder to save every replication's profile in.
+#Returns the lists (total_rides, total_assaults, total_stale_skips), in replication order.
+def runReplications(makeBoard, numSims=50, workers=None, seed=None, verbose=True, profileDirectory=None):
+    total_rides = []
+    total_assaults = []
+    total_stale_skips = []
+    argLists = [(makeBoard, seedSequence) for seedSequence in spawnSeeds(seed, numSims)]
+    if (profileDirectory is not None):
+        os.makedirs(profileDirectory, exist_ok=True)
+        argLists = [args + (os.path.join(profileDirectory, "profile_" + str(i) + ".json"),) for i, args in enumerate(argLists)]
+    for i, (rides, assaults, staleSkips) in enumerate(mapReplications(runReplication, argLists, workers)):
+        if (verbose):
+            print("Simulation " + str(i + 1) + " complete! ")
+        total_rides.append(rides)
+        total_assaults.append(assaults)
+        total_stale_skips.append(staleSkips)
+    return total_rides, total_assaults, total_stale_skips
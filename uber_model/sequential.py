@@ -0,0 +1,93 @@
+import numpy
+import scipy
+from scipy import stats
+
+from .runner import mapReplications, runReplication, spawnSeeds
+
+# Sequential version of the replication runner: stops running simulations once the assaults test is decided.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# The models always run 50 simulations and then test the mean number of assaults against the expected
+# number. Some models are decided long before 50 (sex segregation is far from the baseline after 10),
+# while borderline ones are not decided at 50 either. Here the simulations are run in batches and the
+# t-test is repeated after each batch (a "look"). The simulations stop at the first look where Ho is
+# rejected, or where the confidence interval of the mean is narrower than the requested precision.
+
+# Testing the same data several times inflates the chance of a false rejection, so each look uses
+# alpha divided by the number of looks that could happen (a Bonferroni split of alpha). That keeps the
+# overall false rejection rate at or below alpha however the looks are correlated, at the cost of being
+# a little conservative. Replication i gets the same random stream as in runner.runReplications, so the
+# first n simulations are exactly the first n of the fixed design.
+
+
+#Returns the sample sizes at which the test is run: every batchSize simulations from minSims, and maxSims.
+def lookSizes(minSims, maxSims, batchSize):
+    sizes = list(range(min(minSims, maxSims), maxSims, batchSize))
+    sizes.append(maxSims)
+    return sizes
+
+
+#Runs the one-sample t-test of the values against expected with significance level lookAlpha.
+#Returns a dictionary with the number of simulations, mean, p-value and the half-width of the
+#(1 - lookAlpha) confidence interval of the mean.
+def lookTest(values, expected, lookAlpha):
+    values = numpy.asarray(values, dtype=float)
+    n = len(values)
+    s, p = scipy.stats.ttest_1samp(values, expected, alternative="two-sided")
+    halfWidth = scipy.stats.t.ppf(1 - lookAlpha/2, n - 1) * numpy.std(values, ddof=1) / numpy.sqrt(n)
+    return {"numSims": n, "mean": float(numpy.mean(values)), "pValue": float(p), "halfWidth": float(halfWidth)}
+
+
+#Runs up to maxSims replications of makeBoard() in batches of batchSize on up to `workers`
+#processes, testing the mean number of assaults against expected after each batch. The looks
+#only depend on minSims, maxSims and batchSize, never on workers, so a seed gives the same
+#result on any machine.
+#Stops once Ho is rejected, or once the confidence interval half-width is at most precision
+#(assaults per simulation; None never stops for precision).
+#Returns (total_rides, total_assaults, total_stale_skips, test), where test is the dictionary
+#from the last look plus the stopping reason, the per-look alpha and the number of looks.
+def runSequential(makeBoard, expected, maxSims=50, workers=None, seed=None, minSims=10, batchSize=5,
+                  alpha=0.05, precision=None, verbose=True):
+    sizes = lookSizes(minSims, maxSims, batchSize)
+    lookAlpha = alpha / len(sizes)
+    argLists = [(makeBoard, seedSequence) for seedSequence in spawnSeeds(seed, maxSims)]
+    total_rides = []
+    total_assaults = []
+    total_stale_skips = []
+    for look, size in enumerate(sizes):
+        batch = argLists[len(total_assaults):size]
+        for rides, assaults, staleSkips in mapReplications(runReplication, batch, workers):
+            total_rides.append(rides)
+            total_assaults.append(assaults)
+            total_stale_skips.append(staleSkips)
+            if (verbose):
+                print("Simulation " + str(len(total_assaults)) + " complete! ")
+        test = lookTest(total_assaults, expected, lookAlpha)
+        if (test["pValue"] < lookAlpha):
+            test["stopReason"] = "rejected"
+        elif (precision is not None and test["halfWidth"] <= precision):
+            test["stopReason"] = "precision"
+        elif (size == maxSims):
+            test["stopReason"] = "maxSims"
+        else:
+            continue
+        test["lookAlpha"] = lookAlpha
+        test["looks"] = look + 1
+        test["maxSims"] = maxSims
+        return total_rides, total_assaults, total_stale_skips, test
+
+
+#Prints the outcome of a sequential run in the same layout as the significance tests in the models.
+def printSequentialTest(test, expected, alpha=0.05):
+    print("Sequential assaults test: ")
+    print("Ho: mu = " + str(expected))
+    print("Ha: mu != " + str(expected))
+    print("Significance level = " + str(alpha) + " (" + str(test["lookAlpha"]) + " at each look)")
+    print("Stopped after " + str(test["numSims"]) + " sims at look " + str(test["looks"]) + ": " + test["stopReason"])
+    print("mean assaults: " + str(test["mean"]) + " +/- " + str(test["halfWidth"]))
+    print("P_value = " + str(test["pValue"]))
+    print("Reject Ho = " + str((test["pValue"] < test["lookAlpha"])))
+    print("Sims saved compared with " + str(test["maxSims"]) + ": " + str(test["maxSims"] - test["numSims"]))
+    print()
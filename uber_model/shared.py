@@ -0,0 +1,98 @@
+import sys
+from multiprocessing import shared_memory
+
+import numpy
+
+from .geometry import Geometry
+from .population import Population
+
+# Populations held in shared memory, for running several boards on one population in worker processes.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# paired.py runs every policy on the same population. Handing each policy to its own worker process
+# would mean building the population again in every worker, or pickling it (coordinates, attributes and
+# the whole coverage graph) into every task. None of those arrays ever change during a run: a board only
+# writes to its own state (edgeAlive, needRide, the waiting flags, the policy state). So the parent
+# process copies them once into a multiprocessing.shared_memory block, and what gets pickled is only the
+# block's name and where each array sits in it. A worker attaches to the block and wraps the arrays in
+# a read-only Geometry and Population without copying them, then builds its Board on that population,
+# allocating nothing but the board's own mutable state.
+
+# The process that creates a SharedPopulation owns the block and has to unlink() it when the workers are
+# done (or use it in a with statement); the memory is freed once every process has let go of it.
+
+ALIGNMENT = 64      #BYTE ALIGNMENT OF EACH ARRAY IN THE BLOCK
+
+
+class SharedPopulation:
+
+    #Copies the arrays of population (a population.Population) into a new shared memory block.
+    def __init__(self, population):
+        arrays = {"geometry." + name: value for name, value in vars(population.geometry).items()}
+        arrays.update({"population." + name: value for name, value in population.arrays().items()})
+        self.layout = []        #(NAME, DTYPE, SHAPE, OFFSET) OF EACH ARRAY IN THE BLOCK
+        size = 0
+        for name, value in arrays.items():
+            self.layout.append((name, value.dtype.str, value.shape, size))
+            size += -(-value.nbytes // ALIGNMENT) * ALIGNMENT
+        self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))     #THE SHARED MEMORY BLOCK
+        self.owner = True       #WHETHER THIS PROCESS CREATED THE BLOCK AND SHOULD UNLINK IT
+        for (name, dtype, shape, offset), value in zip(self.layout, arrays.values()):
+            numpy.ndarray(shape, dtype, self.memory.buf, offset)[...] = value
+        self.cached = None
+
+    #Only the block's name and layout are pickled.
+    def __getstate__(self):
+        return {"name": self.memory.name, "layout": self.layout}
+
+    #Attaches to the block in a worker process. Worker processes share their parent's resource
+    #tracker, so the block stays registered once, to the owner, which unlinks it.
+    def __setstate__(self, state):
+        self.layout = state["layout"]
+        if (sys.version_info >= (3, 13)):
+            self.memory = shared_memory.SharedMemory(state["name"], track=False)
+        else:
+            self.memory = shared_memory.SharedMemory(state["name"])
+        self.owner = False
+        self.cached = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.unlink()
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @property
+    def nbytes(self):
+        return self.memory.size
+
+    #The population, as read-only arrays in the shared block. Built once per process; the
+    #population keeps a reference to this object so the block stays attached while it is in use.
+    def population(self):
+        if (self.cached is None):
+            arrays = {}
+            for name, dtype, shape, offset in self.layout:
+                value = numpy.ndarray(shape, dtype, self.memory.buf, offset)
+                value.flags.writeable = False
+                arrays[name] = value
+            geometry = Geometry(**{name[len("geometry."):]: value for name, value in arrays.items() if name.startswith("geometry.")})
+            self.cached = Population.fromArrays(geometry, {name[len("population."):]: value for name, value in arrays.items() if name.startswith("population.")})
+            self.cached.shared = self
+        return self.cached
+
+    #Frees the block. Only the owner does anything; workers just let go of their attachment.
+    def unlink(self):
+        if (self.owner):
+            self.cached = None
+            try:
+                self.memory.close()
+            except BufferError:
+                pass        #ARRAYS OF THE BLOCK ARE STILL IN USE HERE; THEY KEEP THE MAPPING UNTIL THEY GO
+            self.memory.unlink()
+            self.owner = False
@@ -0,0 +1,244 @@
+import inspect
+import json
+import math
+
+import numpy
+from scipy import linalg, optimize
+from scipy.stats import qmc
+
+from . import meanfield
+from .board import Board
+from .policies import Policy
+from .runner import mapReplications, spawnSeeds
+
+# Gaussian-process surrogate of mean rides and assaults over a space of scenario parameters.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# Every point of a parameter sweep (a probAssault, a vettingEfficacy, a driverProbMale, ...) costs a run
+# of many replications. A Surrogate keeps every run it has made and fits a Gaussian process to the mean
+# rides and the mean assaults of each, which predicts both, with a standard deviation, anywhere in the
+# space. explore() chooses where to run next itself: after a small space-filling start it always runs
+# the point the surrogate is least sure of, so runs go where the surface is still unknown rather than
+# on a fixed grid, and it stops once no point in the space is more uncertain than a given fraction.
+
+# A point is a dictionary of parameter values. Names that are Board parameters become Board overrides
+# (driverProbMale for the share of male drivers, mPreference, mPw, wPreference and wPw for the
+# preferences of Uber_Model_choice_test.py); names that are arguments of the surrogate's policy class
+# become arguments of the policy, e.g. vettingEfficacy of DriverVetting or daysUntilReroll of
+# DriverAccountability. A board runs one policy, so one surrogate covers the parameters of one policy
+# together with the Board's. Parameters given as integers in the space are rounded.
+
+# The Gaussian process works on the parameters scaled to [0, 1], with an ARD Matern 5/2 kernel whose
+# length scales, variance and noise are fitted by maximum likelihood (scipy.optimize). Each run's
+# standard error is added to the noise of its point, so well-replicated runs count for more. Where the
+# mean-field estimator (meanfield.py) covers the policy, the process models the difference between the
+# runs and the estimate rather than the runs themselves, so the surrogate starts from the right shape
+# and only has to learn the correction. Every point runs on the same seeds, as in paired.py, so the
+# differences between points are not swamped by the noise between replications.
+
+
+#Builds and runs one board. Defined at module level so it can run on worker processes.
+#Returns (total rides, total assaults).
+def runScenarioReplication(seedSequence, policy, overrides):
+    board = Board(seedSequence, policy, **overrides)
+    board.runSim()
+    return sum(board.rides), sum(board.assaults)
+
+
+class GaussianProcess:
+    #ADJUSTABLE VARIABLES
+    restarts = [0.2, 0.5, 1.0]      #STARTING LENGTH SCALES OF THE LIKELIHOOD MAXIMIZATIONS
+    lengthBounds = (0.02, 20.0)     #BOUNDS ON THE LENGTH SCALES, IN UNITS OF THE SCALED PARAMETERS
+    noiseBounds = (1e-6, 1.0)       #BOUNDS ON THE FITTED NOISE, AS A FRACTION OF THE VARIANCE OF THE DATA
+
+    #Matern 5/2 covariance between the rows of a and of b, with the given length scales and variance.
+    @staticmethod
+    def kernel(a, b, lengths, variance):
+        distance = numpy.sqrt(numpy.maximum((((a[:, None, :] - b[None, :, :])/lengths)**2).sum(axis=2), 0))*math.sqrt(5)
+        return variance*(1 + distance + distance**2/3)*numpy.exp(-distance)
+
+    #Negative log marginal likelihood of standardized data, given the log length scales, log
+    #variance and log fitted noise in theta.
+    def negativeLogLikelihood(self, theta, x, y, noise):
+        d = x.shape[1]
+        lengths, variance, nugget = numpy.exp(theta[:d]), math.exp(theta[d]), math.exp(theta[d + 1])
+        covariance = self.kernel(x, x, lengths, variance) + numpy.diag(noise + nugget)
+        try:
+            factor = linalg.cho_factor(covariance, lower=True)
+        except linalg.LinAlgError:
+            return 1e25
+        alpha = linalg.cho_solve(factor, y)
+        return 0.5*y @ alpha + numpy.log(numpy.diag(factor[0])).sum() + 0.5*len(y)*math.log(2*math.pi)
+
+    #Fits the process to observations y at the rows of x (parameters scaled to [0, 1]), each with
+    #a known noise variance (the square of its standard error).
+    def fit(self, x, y, noise):
+        self.x = numpy.asarray(x, dtype=float)
+        y = numpy.asarray(y, dtype=float)
+        self.offset = float(numpy.mean(y))
+        self.scale = float(numpy.std(y)) if numpy.std(y) > 0 else 1.0
+        z = (y - self.offset)/self.scale
+        noise = numpy.asarray(noise, dtype=float)/self.scale**2
+        d = self.x.shape[1]
+        bounds = [tuple(numpy.log(self.lengthBounds))]*d + [(math.log(1e-3), math.log(100.0)), tuple(numpy.log(self.noiseBounds))]
+        best = None
+        for length in self.restarts:
+            start = numpy.r_[numpy.full(d, math.log(length)), 0.0, math.log(1e-3)]
+            result = optimize.minimize(self.negativeLogLikelihood, start, args=(self.x, z, noise), method="L-BFGS-B", bounds=bounds)
+            if (best is None or result.fun < best.fun):
+                best = result
+        self.lengths = numpy.exp(best.x[:d])
+        self.variance = math.exp(best.x[d])
+        self.nugget = math.exp(best.x[d + 1])
+        covariance = self.kernel(self.x, self.x, self.lengths, self.variance) + numpy.diag(noise + self.nugget)
+        self.factor = linalg.cho_factor(covariance, lower=True)
+        self.alpha = linalg.cho_solve(self.factor, z)
+        return self
+
+    #Predicted mean and standard deviation of the fitted function at the rows of x.
+    def predict(self, x):
+        x = numpy.atleast_2d(numpy.asarray(x, dtype=float))
+        cross = self.kernel(x, self.x, self.lengths, self.variance)
+        mean = cross @ self.alpha
+        variance = self.variance - (cross*linalg.cho_solve(self.factor, cross.T).T).sum(axis=1)
+        return self.offset + self.scale*mean, self.scale*numpy.sqrt(numpy.maximum(variance, 0))
+
+
+class Surrogate:
+    #ADJUSTABLE VARIABLES
+    numCandidates = 1024    #NUMBER OF CANDIDATE POINTS THE NEXT RUN IS CHOSEN FROM
+
+    #space maps each parameter name to its (low, high) range. policyType is the Policy class whose
+    #arguments can be in the space (the baseline Policy if None). Each point is run numSims times on
+    #up to `workers` processes, on the same seeds from `seed`. Other keyword arguments are Board
+    #parameter overrides used at every point.
+    def __init__(self, space, policyType=None, numSims=20, workers=None, seed=None, priorMean=True, **overrides):
+        self.names = list(space)                #NAMES OF THE PARAMETERS, IN THE ORDER OF THE SCALED COORDINATES
+        self.low = numpy.array([space[name][0] for name in self.names], dtype=float)
+        self.high = numpy.array([space[name][1] for name in self.names], dtype=float)
+        self.integer = [all(isinstance(bound, int) for bound in space[name]) for name in self.names]
+        self.policyType = policyType if policyType is not None else Policy
+        self.policyArguments = {name for name, parameter in inspect.signature(self.policyType).parameters.items()
+                                if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)}
+        for name in self.names:
+            if (name not in self.policyArguments and not hasattr(Board, name)):
+                raise ValueError(repr(name) + " is neither a Board parameter nor an argument of " + self.policyType.__name__)
+        self.numSims = numSims
+        self.workers = workers
+        self.seedSequences = spawnSeeds(seed, numSims)  #THE SAME SEEDS ARE RUN AT EVERY POINT
+        self.priorMean = priorMean and self.policyType in meanfield.POLICIES    #WHETHER TO MODEL THE RUNS AS A CORRECTION TO THE MEAN-FIELD ESTIMATE
+        self.overrides = overrides
+        self.results = []       #EVERY RUN: ITS POINT, MEAN RIDES AND ASSAULTS AND THEIR STANDARD ERRORS
+        self.models = None      #THE FITTED GaussianProcess OF "rides" AND "assaults"
+
+    #The policy and Board overrides of a point, which must give a value for every parameter of the space.
+    def scenario(self, point):
+        if (set(point) != set(self.names)):
+            raise ValueError("a point needs exactly the parameters " + ", ".join(self.names) + ", not " + ", ".join(point))
+        point = {name: int(round(point[name])) if integer else float(point[name]) for name, integer in zip(self.names, self.integer)}
+        policy = self.policyType(**{name: value for name, value in point.items() if name in self.policyArguments})
+        overrides = dict(self.overrides, **{name: value for name, value in point.items() if name not in self.policyArguments})
+        return policy, overrides
+
+    #Point of the space at scaled coordinates u in [0, 1].
+    def pointAt(self, u):
+        values = self.low + numpy.asarray(u)*(self.high - self.low)
+        return {name: (int(round(value)) if integer else float(value)) for name, value, integer in zip(self.names, values, self.integer)}
+
+    #Scaled coordinates of a point.
+    def scaled(self, point):
+        return (numpy.array([point[name] for name in self.names], dtype=float) - self.low)/(self.high - self.low)
+
+    #The mean-field estimate (rides, assaults) at a point, or zeros if it is not used or does not
+    #cover the policy.
+    def prior(self, point):
+        if (not self.priorMean):
+            return 0.0, 0.0
+        policy, overrides = self.scenario(point)
+        return meanfield.estimate(policy, **overrides)
+
+    #Runs numSims replications at a point and adds the run to the results.
+    def run(self, point, verbose=False):
+        policy, overrides = self.scenario(point)
+        argLists = [(seedSequence, policy, overrides) for seedSequence in self.seedSequences]
+        rides, assaults = (numpy.array(column, dtype=float) for column in zip(*mapReplications(runScenarioReplication, argLists, self.workers)))
+        result = {"point": point, "rides": float(rides.mean()), "assaults": float(assaults.mean()),
+                  "ridesError": float(rides.std(ddof=1)/math.sqrt(len(rides))) if len(rides) > 1 else 0.0,
+                  "assaultsError": float(assaults.std(ddof=1)/math.sqrt(len(assaults))) if len(assaults) > 1 else 0.0}
+        self.results.append(result)
+        self.models = None
+        if (verbose):
+            print("Run " + str(len(self.results)) + " at " + str(point) + ": rides " + str(result["rides"]) + ", assaults " + str(result["assaults"]))
+        return result
+
+    #Fits a Gaussian process to the rides and to the assaults of every run so far.
+    def fit(self):
+        if (len(self.results) < 2):
+            raise ValueError("the surrogate needs at least 2 runs to fit, not " + str(len(self.results)))
+        x = numpy.array([self.scaled(result["point"]) for result in self.results])
+        priors = numpy.array([self.prior(result["point"]) for result in self.results])
+        self.models = {}
+        for column, name in enumerate(("rides", "assaults")):
+            y = numpy.array([result[name] for result in self.results]) - priors[:, column]
+            noise = numpy.array([result[name + "Error"] for result in self.results])**2
+            self.models[name] = GaussianProcess().fit(x, y, noise)
+        return self
+
+    #Predicted mean rides and assaults at the given points, each with its standard deviation.
+    #Returns a dictionary of ("rides", "ridesSd", "assaults", "assaultsSd") arrays.
+    def predict(self, points):
+        if (self.models is None):
+            self.fit()
+        x = numpy.array([self.scaled(point) for point in points])
+        priors = numpy.array([self.prior(point) for point in points])
+        prediction = {}
+        for column, name in enumerate(("rides", "assaults")):
+            mean, sd = self.models[name].predict(x)
+            prediction[name] = mean + priors[:, column]
+            prediction[name + "Sd"] = sd
+        return prediction
+
+    #The candidate point where the predicted assaults are least certain, and their standard
+    #deviation there. Candidates are a scrambled Sobol sequence over the space.
+    def suggest(self, rng=None):
+        if (self.models is None):
+            self.fit()
+        candidates = qmc.Sobol(len(self.names), seed=rng).random(self.numCandidates)
+        mean, sd = self.models["assaults"].predict(candidates)
+        best = int(numpy.argmax(sd))
+        return self.pointAt(candidates[best]), float(sd[best])
+
+    #Maps the space with at most `budget` runs: a Latin hypercube of `initial` points, then one
+    #run at a time where the surrogate is least certain, until the largest standard deviation of the
+    #predicted assaults is below `tolerance` times their mean over the runs.
+    #Returns the number of runs made.
+    def explore(self, budget=30, initial=None, tolerance=0.05, seed=None, verbose=True):
+        rng = numpy.random.default_rng(seed)
+        initial = min(initial if initial is not None else 2*len(self.names) + 1, budget)
+        start = len(self.results)
+        if (initial > len(self.results)):
+            for u in qmc.LatinHypercube(len(self.names), seed=rng).random(initial - len(self.results)):
+                self.run(self.pointAt(u), verbose)
+        while (len(self.results) - start < budget):
+            point, sd = self.suggest(rng)
+            scale = numpy.mean([result["assaults"] for result in self.results])
+            if (verbose):
+                print("Largest uncertainty: +/- " + str(sd) + " assaults")
+            if (sd < tolerance*scale):
+                break
+            self.run(point, verbose)
+        return len(self.results) - start
+
+    #Writes every run to a JSON file, so results can be added to in later sessions.
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump(self.results, file, indent=1)
+
+    #Adds the runs in a JSON file written by save().
+    def load(self, path):
+        with open(path) as file:
+            self.results.extend(json.load(file))
+        self.models = None
+        return self
@@ -0,0 +1,207 @@
+import math
+import resource
+
+import numpy
+
+from .board import Board, toSeedSequence
+from .geometry import findInRange
+from .population import Population, drawAttributes, drawPreferences
+from .runner import mapReplications
+
+# Real-scale mode: a board with millions of drivers, simulated one spatial tile at a time.
+
+# Author: Ian Roberts
+# Date of last Update: 2026-10-17
+
+# The models run 1000 drivers on a 10x10 board. A real population (5 million drivers, 111 million riders)
+# at the same density needs a board hundreds of units across, far too big to hold as one Board. But
+# nobody further apart than one radius ever interacts, and drivers can give as many rides as they have
+# riders waiting, so the board can be cut into square tiles and each tile run as its own Board, one
+# after another, keeping only the per-day totals.
+
+# Every rider belongs to exactly one tile: the one they stand in. A tile's Board holds its own riders,
+# its own drivers and the "halo" of drivers from the neighbouring tiles within one radius of its edge,
+# so every driver that can reach one of its riders is on the board. Each driver and rider is drawn
+# from the random stream of its own tile, so a halo driver is the same person (same sex, same malice)
+# in every tile it appears in. A (driver, rider) pair only ever meets in the rider's tile, so assaults
+# and the pairs they remove are tracked in one place. Every rider who needs a ride and has a driver in
+# range gets one, exactly as on a single board, so ride counts follow the same distribution. The only
+# difference is which driver serves a rider near a tile edge: a halo driver's queue only holds the
+# riders of the tile being run, so the pickup order there is not exactly the one a single board would
+# use. Each tile's policy would change its halo drivers on its own, so policies that change drivers
+# (Policy.changesDrivers: driver vetting, more women drivers, driver accountability) are refused.
+
+# Tiles are sized so that one tile fits in maxRSS bytes (split evenly between the worker processes),
+# using bytesPerDriver as the estimate of a tile's peak memory per driver. The estimate is only used to
+# choose the tile size; the limit itself is enforced by capping the address space of the process while
+# it runs a tile (resource.RLIMIT_AS), so an allocation that would go over it fails with a MemoryError
+# instead of taking the memory. The address space counts memory mapped but not yet used, so it is
+# always at least the resident set size, and a process never holds more than its share of maxRSS.
+
+
+#Peak resident set size of this process so far, in bytes.
+def peakRSS():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+#Address space of this process, in bytes: the size RLIMIT_AS caps.
+def addressSpace():
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[0]) * resource.getpagesize()
+
+
+#Runs one tile of a tiled board. Defined at module level so it can run on worker processes.
+def runTile(tiledBoard, tile):
+    return tiledBoard.runTile(tile)
+
+
+class TiledBoard:
+    #ADJUSTABLE VARIABLES
+    numDrivers = 1000000        #NUMBER OF DRIVERS IN THE SIMULATION
+    maxRSS = 2*1024**3          #LIMIT ON THE PEAK MEMORY OF EACH PROCESS RUNNING TILES, IN BYTES (SHARED BY ALL WORKERS)
+    bytesPerDriver = 32000      #ESTIMATED PEAK MEMORY OF A TILE PER DRIVER ON IT, WITH THEIR RIDERS AND PAIRS IN RANGE
+
+    #boardType is the Board class each tile is run with, and policy its policy (the baseline if None).
+    #Other keyword arguments are parameters of the TiledBoard or overrides for boardType; the board
+    #keeps boardType's density of drivers per unit area. tilesPerSide fixes the number of tiles
+    #instead of working it out from maxRSS.
+    def __init__(self, seed=None, policy=None, boardType=Board, workers=1, tilesPerSide=None, **overrides):
+        if (policy is not None and policy.changesDrivers):
+            raise ValueError("the " + policy.name + " policy changes drivers, which a tiled board cannot keep the same in every tile")
+        for name in ("numDrivers", "maxRSS", "bytesPerDriver"):
+            if (name in overrides):
+                setattr(self, name, overrides.pop(name))
+        self.boardType = boardType      #BOARD CLASS EACH TILE IS RUN WITH
+        self.policy = policy            #POLICY EACH TILE IS RUN WITH
+        self.overrides = overrides      #PARAMETER OVERRIDES FOR EACH TILE'S BOARD
+        self.workers = workers          #NUMBER OF PROCESSES RUNNING TILES
+        self.parameters = boardType.__new__(boardType)      #THE TILES' PARAMETERS, FOR DRAWING AGENTS
+        self.parameters.setParameters(overrides)
+        self.numRiders = int(self.parameters.ridersPer*self.numDrivers)     #NUMBER OF RIDERS IN THE SIMULATION
+        self.numDays = self.parameters.numDays
+        self.radius = self.parameters.radius
+        self.boardSize = self.parameters.boardSize * math.sqrt(self.numDrivers / self.parameters.numDrivers)  #LENGTH OF EACH SIDE OF THE BOARD
+        self.expectedRides = self.parameters.ridesPerDriverDay*self.numDays*self.numDrivers
+        self.expectedAssaults = self.parameters.assaultsPerDriver*self.numDrivers
+        self.tilesPerSide = tilesPerSide if tilesPerSide is not None else self.chooseTilesPerSide()    #NUMBER OF TILES ALONG EACH SIDE
+        self.tileSize = self.boardSize / self.tilesPerSide      #LENGTH OF EACH SIDE OF A TILE
+        if (self.tileSize < self.radius):
+            raise ValueError("tiles of side " + str(self.tileSize) + " are smaller than the radius " + str(self.radius))
+        numTiles = self.tilesPerSide**2
+        countSeed, tileSeed = toSeedSequence(seed).spawn(2)
+        countRng = numpy.random.default_rng(countSeed)
+        self.tileDrivers = countRng.multinomial(self.numDrivers, numpy.full(numTiles, 1/numTiles))    #NUMBER OF DRIVERS IN EACH TILE
+        self.tileRiders = countRng.multinomial(self.numRiders, numpy.full(numTiles, 1/numTiles))      #NUMBER OF RIDERS IN EACH TILE
+        self.tileSeed = tileSeed    #PARENT OF THE TILES' RANDOM STREAMS
+        self.day = 0                #GETTER FOR CURRENT DAY
+        self.assaults = []          #TRACKS ASSAULTS BY DAY
+        self.rides = []             #TRACKS TOTAL RIDES BY DAY
+        self.staleSkips = []        #TRACKS QUEUED RIDERS SKIPPED BECAUSE ANOTHER DRIVER ALREADY SERVED THEM, BY DAY
+        self.peakRSS = 0            #HIGHEST PEAK MEMORY OF ANY PROCESS THAT RAN A TILE, IN BYTES
+
+    #Estimated peak memory of a tile of the given side, halo included.
+    def tileBytes(self, tileSize):
+        driversPerArea = self.numDrivers / self.boardSize**2
+        return driversPerArea * (tileSize + 2*self.radius)**2 * self.bytesPerDriver
+
+    #Smallest number of tiles per side whose tiles fit in each worker's share of maxRSS.
+    def chooseTilesPerSide(self):
+        budget = self.maxRSS / self.workers - addressSpace()
+        tilesPerSide = 1
+        while (self.tileBytes(self.boardSize / tilesPerSide) > budget):
+            tilesPerSide += 1
+            if (self.boardSize / tilesPerSide < self.radius):
+                raise MemoryError("maxRSS of " + str(self.maxRSS) + " bytes is too small for a tile one radius across")
+        return tilesPerSide
+
+    #The random stream of a tile: child number `tile` of tileSeed, the same child
+    #tileSeed.spawn() would give, without spawning all of them.
+    def tileSeedSequence(self, tile):
+        return numpy.random.SeedSequence(self.tileSeed.entropy, spawn_key=self.tileSeed.spawn_key + (tile,), pool_size=self.tileSeed.pool_size)
+
+    #Corners (x0, y0, x1, y1) of a tile.
+    def tileBounds(self, tile):
+        i, j = divmod(tile, self.tilesPerSide)
+        return (i*self.tileSize, j*self.tileSize, (i + 1)*self.tileSize, (j + 1)*self.tileSize)
+
+    #Draws the coordinates and attributes of a tile's drivers, or its riders, from the tile's
+    #stream. The same tile always gives the same agents, so halo drivers can be drawn again.
+    def drawTile(self, tile, riders):
+        driverSeed, riderSeed, boardSeed = self.tileSeedSequence(tile).spawn(3)
+        rng = numpy.random.default_rng(riderSeed if riders else driverSeed)
+        n = int(self.tileRiders[tile] if riders else self.tileDrivers[tile])
+        x0, y0, x1, y1 = self.tileBounds(tile)
+        coords = rng.uniform((x0, y0), (x1, y1), (n, 2))
+        probMale = self.parameters.riderProbMale if riders else self.parameters.driverProbMale
+        attributes = drawAttributes(rng, n, probMale, self.parameters)
+        if (riders):
+            attributes = attributes + (drawPreferences(rng, *attributes, self.parameters),)
+        return coords, attributes
+
+    #Drivers of the tile followed by the drivers of the neighbouring tiles within one radius of it.
+    def tileDriversWithHalo(self, tile):
+        x0, y0, x1, y1 = self.tileBounds(tile)
+        i, j = divmod(tile, self.tilesPerSide)
+        coords, attributes = self.drawTile(tile, False)
+        coordList = [coords]
+        attributeLists = [[attribute] for attribute in attributes]
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                if ((di, dj) == (0, 0) or not (0 <= i + di < self.tilesPerSide and 0 <= j + dj < self.tilesPerSide)):
+                    continue
+                coords, attributes = self.drawTile((i + di)*self.tilesPerSide + j + dj, False)
+                dx = numpy.maximum(numpy.maximum(x0 - coords[:, 0], coords[:, 0] - x1), 0)
+                dy = numpy.maximum(numpy.maximum(y0 - coords[:, 1], coords[:, 1] - y1), 0)
+                inHalo = dx**2 + dy**2 <= self.radius**2
+                coordList.append(coords[inHalo])
+                for attributeList, attribute in zip(attributeLists, attributes):
+                    attributeList.append(attribute[inHalo])
+        return numpy.concatenate(coordList), [numpy.concatenate(attributeList) for attributeList in attributeLists]
+
+    #Builds the Board for one tile.
+    def buildTile(self, tile):
+        driverCoords, (driverMale, driverMalicious, driverTargetWomen) = self.tileDriversWithHalo(tile)
+        riderCoords, (riderMale, riderMalicious, riderTargetWomen, riderPreference) = self.drawTile(tile, True)
+        geometry = findInRange(driverCoords.astype(numpy.float32), riderCoords.astype(numpy.float32), self.radius)
+        population = Population.fromArrays(geometry, {
+            "driverMale": driverMale, "driverMalicious": driverMalicious, "driverTargetWomen": driverTargetWomen,
+            "riderMale": riderMale, "riderMalicious": riderMalicious, "riderTargetWomen": riderTargetWomen,
+            "riderPreference": riderPreference})
+        boardSeed = self.tileSeedSequence(tile).spawn(3)[2]
+        return self.boardType(boardSeed, self.policy, population, numDrivers=len(driverCoords), **self.overrides)
+
+    #Runs every day on one tile, with the process's address space capped at its share of maxRSS.
+    #Returns its per-day (rides, assaults, staleSkips) and the process's peak memory.
+    def runTile(self, tile):
+        limit = int(self.maxRSS / self.workers)
+        soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if (hard != resource.RLIM_INFINITY and hard < limit):
+            limit = hard
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        try:
+            board = self.buildTile(tile)
+            board.runSim()
+        except MemoryError:
+            raise MemoryError("tile " + str(tile) + " went over the memory limit of " + str(limit) + " bytes") from None
+        finally:
+            resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+        return board.rides, board.assaults, board.staleSkips, peakRSS()
+
+    #Runs the simulation, tile by tile, and adds up each day's totals over the tiles.
+    def runSim(self, verbose=False):
+        rides = numpy.zeros(self.numDays, dtype=numpy.int64)
+        assaults = numpy.zeros(self.numDays, dtype=numpy.int64)
+        staleSkips = numpy.zeros(self.numDays, dtype=numpy.int64)
+        numTiles = self.tilesPerSide**2
+        argLists = [(self, tile) for tile in range(numTiles)]
+        for tile, (tileRides, tileAssaults, tileStaleSkips, tilePeak) in enumerate(mapReplications(runTile, argLists, self.workers)):
+            rides += tileRides
+            assaults += tileAssaults
+            staleSkips += tileStaleSkips
+            self.peakRSS = max(self.peakRSS, tilePeak)
+            if (verbose):
+                print("Tile " + str(tile + 1) + " of " + str(numTiles) + " complete! ")
+        self.rides = rides.tolist()
+        self.assaults = assaults.tolist()
+        self.staleSkips = staleSkips.tolist()
+        self.day = self.numDays